@@ -2,6 +2,25 @@ import orjson
 
 ORJSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
 
+# Storage
+# "sqlite" (data.db) or "json" (manifest.journal and one file per test in tests/)
+STORAGE_BACKEND = "sqlite"
+# Journal records are written compact (one record per line), the indented
+# ORJSON_OPTIONS is only for files meant to be read by humans
+JOURNAL_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+# Compact the journal once it has grown this much since the last snapshot
+# (and also grown past the size of the snapshot itself)
+JOURNAL_COMPACT_THRESHOLD = 256 * 1024  # bytes
+# Changes are written by a background thread once nothing changed for WRITE_DELAY,
+# but never later than MAX_WRITE_DELAY after the first change
+WRITE_DELAY = 0.5  # seconds
+MAX_WRITE_DELAY = 2  # seconds
+
+# Test session
+CLOCK_TICK = 200  # milliseconds, how often the time labels are refreshed
+# The session is written to session.checkpoint this often, so it can be resumed after a crash
+CHECKPOINT_INTERVAL = 5000  # milliseconds
+
 # Date in Indonesia
 DAY_INDO = {
     "monday": "senin",
@@ -60,3 +79,23 @@ GREEN_BTN_QSS = f"""
         background: { GREEN_2 };
     }}
 """
+
+# Application stylesheet, set once in main.py together with the theme.
+# Widgets change their look only by flipping a state matched here:
+# > option: set once on the answer option buttons, the chosen option is the checked one,
+#   a change of the checked state needs no polish, so it's cheap enough for every keystroke
+# > finish: the "Selesai" button of the last question (dynamic property, see set_state)
+APP_QSS = f"""
+    QPushButton[option="true"]:checked {{
+        background: { BLUE_2 };
+        color: white;
+    }}
+    QPushButton[finish="true"] {{
+        background: { GREEN_1 };
+        color: white;
+        border: none;
+    }}
+    QPushButton[finish="true"]:hover:!pressed {{
+        background: { GREEN_2 };
+    }}
+"""
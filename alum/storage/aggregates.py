@@ -0,0 +1,218 @@
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from datetime import date, datetime
+import os
+
+import orjson
+
+from .files import atomic_write
+from ..constants import JOURNAL_ORJSON_OPTIONS
+
+AGGREGATES_FILE = "aggregates.json"
+AGGREGATES_VERSION = 1
+# The accuracy is also averaged over the last tests, for each of these counts
+ACCURACY_WINDOWS = (5, 10)
+# Dates of the rows, sorted as text in date order
+ROW_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+# Date of a summary (TIME_FORMAT) in ROW_TIME_FORMAT, both are zero padded
+# so the parts are only moved around, nothing is parsed
+def row_date(tests_date: str) -> str:
+    return f"{tests_date[6:10]}-{tests_date[3:5]}-{tests_date[:2]} {tests_date[12:]}"
+
+
+# What one test adds to the aggregates: [date, correct, incorrect, total time in milliseconds],
+# everything comes from the summary of the test (see test_summary)
+def test_row(summary: dict) -> list:
+    return [
+        row_date(summary["tanggal_tes"]),
+        summary["benar"],
+        summary["salah"],
+        summary["waktu_total"],
+    ]
+
+
+# Statistics of the whole history, kept up to date when a test is saved, changed or deleted
+# so the home screen never reads the test data for them:
+# the row of the test (see test_row) is taken out of every count and the new row is put in.
+# Only the rows are needed to build everything again, they are kept in AGGREGATES_FILE
+# together with the statistics themselves (see to_dict), which are loaded back as they are
+# (see from_record)
+class HistoryAggregates:
+    def __init__(self):
+        self.rows = {}  # id -> row
+        self.order = []  # (date, id) of every test, oldest first
+        self.day_counts = {}  # date ordinal -> tests done on that day
+        self.total_time = 0
+        # [correct, incorrect, tests] for each weekday, Monday first
+        self.weekdays = [[0, 0, 0] for _ in range(7)]
+        self.longest_streak = 0
+
+    # The aggregates saved in AGGREGATES_FILE (see read_aggregates),
+    # only the tests done on each day are counted again
+    @classmethod
+    def from_record(cls, record: dict) -> "HistoryAggregates":
+        aggregates = cls()
+        # json keys are always str
+        aggregates.rows = {int(test_id): row for test_id, row in record["tes"].items()}
+        aggregates.order = sorted(
+            (row[0], test_id) for test_id, row in aggregates.rows.items()
+        )
+        for tests_date, _ in aggregates.order:
+            day = date.fromisoformat(tests_date[:10]).toordinal()
+            aggregates.day_counts[day] = aggregates.day_counts.get(day, 0) + 1
+        aggregates.total_time = record["waktu_total"]
+        aggregates.weekdays = record["per_hari"]
+        aggregates.longest_streak = record["rangkaian_terpanjang"]
+        return aggregates
+
+    def add(self, test_id: int, row: list):
+        tests_date, correct, incorrect, total_time = row
+        self.rows[test_id] = row
+        insort(self.order, (tests_date, test_id))
+        self.total_time += total_time
+
+        day = datetime.strptime(tests_date, ROW_TIME_FORMAT).date()
+        weekday = self.weekdays[day.weekday()]
+        weekday[0] += correct
+        weekday[1] += incorrect
+        weekday[2] += 1
+
+        day = day.toordinal()
+        self.day_counts[day] = self.day_counts.get(day, 0) + 1
+        # A new day can only make the streak it's in longer
+        if self.day_counts[day] == 1:
+            self.longest_streak = max(self.longest_streak, self.streak_around(day))
+
+    def remove(self, test_id: int):
+        tests_date, correct, incorrect, total_time = self.rows.pop(test_id)
+        del self.order[bisect_left(self.order, (tests_date, test_id))]
+        self.total_time -= total_time
+
+        day = datetime.strptime(tests_date, ROW_TIME_FORMAT).date()
+        weekday = self.weekdays[day.weekday()]
+        weekday[0] -= correct
+        weekday[1] -= incorrect
+        weekday[2] -= 1
+
+        day = day.toordinal()
+        self.day_counts[day] -= 1
+        # A day without tests may have split the longest streak, the only case
+        # where every day is looked at again
+        if self.day_counts[day] == 0:
+            del self.day_counts[day]
+            self.longest_streak = self.find_longest_streak()
+
+    # The row of a test that is new or changed
+    def replace(self, test_id: int, row: list):
+        if test_id in self.rows:
+            self.remove(test_id)
+        self.add(test_id, row)
+
+    # Days in a row with a test, around a day with a test
+    def streak_around(self, day: int) -> int:
+        first = last = day
+        while first - 1 in self.day_counts:
+            first -= 1
+        while last + 1 in self.day_counts:
+            last += 1
+        return last - first + 1
+
+    def find_longest_streak(self) -> int:
+        longest = streak = 0
+        previous_day = None
+        for day in sorted(self.day_counts):
+            streak = streak + 1 if previous_day == day - 1 else 1
+            longest = max(longest, streak)
+            previous_day = day
+        return longest
+
+    # Days in a row with a test up to today, a streak is still going on
+    # if the last test was today or yesterday
+    def current_streak(self, today: int) -> int:
+        if not self.order:
+            return 0
+        last_day = datetime.strptime(self.order[-1][0], ROW_TIME_FORMAT).toordinal()
+        if last_day < today - 1:
+            return 0
+        day = last_day
+        while day - 1 in self.day_counts:
+            day -= 1
+        return last_day - day + 1
+
+    # Mean accuracy (correct / (correct + incorrect)) of the last window tests,
+    # None if none of them has an answer key
+    def recent_accuracy(self, window: int):
+        accuracies = []
+        for _, test_id in self.order[-window:]:
+            _, correct, incorrect, _ = self.rows[test_id]
+            if correct + incorrect:
+                accuracies.append(correct / (correct + incorrect))
+        if not accuracies:
+            return None
+        return sum(accuracies) / len(accuracies)
+
+    # Index (Monday = 0) and accuracy of the weekday with the best accuracy, None if no test
+    def best_weekday(self):
+        best = None
+        for weekday, (correct, incorrect, _) in enumerate(self.weekdays):
+            if correct + incorrect == 0:
+                continue
+            accuracy = correct / (correct + incorrect)
+            if best is None or accuracy > best[1]:
+                best = (weekday, accuracy)
+        return best
+
+    # Content of AGGREGATES_FILE, the streak is the one that ended with the last test
+    def to_dict(self) -> dict:
+        last_day = (
+            datetime.strptime(self.order[-1][0], ROW_TIME_FORMAT).toordinal()
+            if self.order
+            else 0
+        )
+        return {
+            "versi": AGGREGATES_VERSION,
+            "tes": dict(self.rows),
+            "jumlah_tes": len(self.rows),
+            "waktu_total": self.total_time,
+            "per_hari": [list(counts) for counts in self.weekdays],
+            "akurasi": {
+                window: self.recent_accuracy(window) for window in ACCURACY_WINDOWS
+            },
+            "rangkaian": self.current_streak(last_day),
+            "rangkaian_terpanjang": self.longest_streak,
+        }
+
+
+# Content of AGGREGATES_FILE in root_path (see to_dict),
+# None if there is none yet, or it's from another version
+def read_aggregates(root_path: str):
+    path = os.path.join(root_path, AGGREGATES_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        try:
+            record = orjson.loads(f.read())
+        except orjson.JSONDecodeError:
+            return None
+    if record.get("versi") != AGGREGATES_VERSION:
+        return None
+    return record
+
+
+# Writes AGGREGATES_FILE for a BackgroundWriter, the whole file is replaced every time
+class AggregatesFile:
+    def __init__(self, path: str):
+        self.path = path
+
+    @contextmanager
+    def batch(self):
+        yield
+
+    @contextmanager
+    def change(self):
+        yield
+
+    def write(self, aggregates: dict):
+        atomic_write(self.path, orjson.dumps(aggregates, option=JOURNAL_ORJSON_OPTIONS))
@@ -0,0 +1,110 @@
+from datetime import datetime
+
+import numpy as np
+
+from .codec import NO_ANSWER
+from ..constants import TIME_FORMAT
+
+
+# Statistics of the whole history, every saved test at once.
+# The tests are stacked into 2D arrays, one row per test (oldest first) and one column
+# per question position, padded to the longest test:
+# > answers, keys: option indices, NO_ANSWER if empty (and in the padding)
+# > times: milliseconds spent on each question
+# > valid: False in the padding
+# The result of every question is worked out once, with the same rules as count_results
+# (an empty answer is incorrect, an empty answer key is undetermined),
+# so every statistic below is a few array operations instead of a loop over the questions.
+class TestHistory:
+    def __init__(self, tests: dict):
+        # id -> test data (compact form), sorted by the date of the test
+        tests = sorted(
+            tests.items(),
+            key=lambda item: datetime.strptime(item[1]["tanggal_tes"], TIME_FORMAT),
+        )
+        self.test_ids = [test_id for test_id, _ in tests]
+        self.dates = [
+            datetime.strptime(test_data["tanggal_tes"], TIME_FORMAT)
+            for _, test_data in tests
+        ]
+        self.question_counts = np.array(
+            [test_data["jumlah_soal"] for _, test_data in tests], dtype=np.int64
+        )
+        # Options of the test with the most options, the others use the first ones of it
+        self.question_options = max(
+            (test_data["opsi_soal"] for _, test_data in tests), key=len, default=[]
+        )
+        self.options_count = len(self.question_options)
+
+        shape = (len(tests), int(self.question_counts.max(initial=0)))
+        self.answers = np.full(shape, NO_ANSWER, dtype=np.uint8)
+        self.keys = np.full(shape, NO_ANSWER, dtype=np.uint8)
+        self.times = np.zeros(shape, dtype=np.uint32)
+        for row, (_, test_data) in enumerate(tests):
+            count = test_data["jumlah_soal"]
+            self.answers[row, :count] = np.frombuffer(test_data["jawaban"], np.uint8)
+            self.keys[row, :count] = np.frombuffer(test_data["kunci"], np.uint8)
+            self.times[row, :count] = np.frombuffer(
+                test_data["waktu"], test_data["waktu"].typecode
+            )
+
+        self.valid = np.arange(shape[1]) < self.question_counts[:, None]
+        self.answered = self.answers != NO_ANSWER
+        self.has_key = self.valid & (self.keys != NO_ANSWER)
+        self.correct = self.answered & self.has_key & (self.answers == self.keys)
+        self.undetermined = self.answered & ~self.has_key
+        self.incorrect = self.valid & ~self.correct & ~self.undetermined
+
+    # Accuracy of every test, correct / (correct + incorrect), NaN if it has no answer key,
+    # and its rolling mean over the last window tests (the tests without a key are skipped)
+    def accuracy_trend(self, window: int = 5) -> tuple:
+        correct = self.correct.sum(axis=1)
+        determined = correct + self.incorrect.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            accuracy = correct / determined
+
+        known = ~np.isnan(accuracy)
+
+        def window_sum(values):
+            sums = np.cumsum(values, dtype=np.float64)
+            sums[window:] = sums[window:] - sums[:-window]
+            return sums
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rolling = window_sum(np.where(known, accuracy, 0.0)) / window_sum(known)
+        return accuracy, rolling
+
+    # Correct rate by the time spent on the question, for the answered questions with a key.
+    # Return (bin edges in seconds, questions in each bin, correct rate of each bin),
+    # the last bin also has every question that took longer
+    def time_vs_correctness(self, bin_seconds: int = 30, bins: int = 10) -> tuple:
+        scored = self.answered & self.has_key
+        bin_idx = np.minimum(self.times[scored] // (bin_seconds * 1000), bins - 1)
+        counts = np.bincount(bin_idx, minlength=bins)
+        correct = np.bincount(bin_idx, weights=self.correct[scored], minlength=bins)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = correct / counts
+        return np.arange(bins + 1) * bin_seconds, counts, rate
+
+    # How often each option is chosen compared to how often it is the answer key,
+    # (share of the answers, share of the answer keys) by the index of the option.
+    # An option that is chosen more than it is the key is the one picked when guessing
+    def option_bias(self) -> tuple:
+        answer_counts = np.bincount(
+            self.answers[self.answered], minlength=self.options_count
+        )
+        key_counts = np.bincount(self.keys[self.has_key], minlength=self.options_count)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (
+                answer_counts / answer_counts.sum(),
+                key_counts / key_counts.sum(),
+            )
+
+    # Incorrect rate of every question position (question number - nomor_pertama)
+    # over the tests that have an answer key for it, NaN if none has.
+    # Return (incorrect rate, number of tests) by position
+    def position_difficulty(self) -> tuple:
+        incorrect = (self.incorrect & self.has_key).sum(axis=0)
+        determined = self.has_key.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return incorrect / determined, determined
@@ -0,0 +1,145 @@
+from array import array
+import base64
+from contextlib import contextmanager
+import os
+
+import orjson
+
+from .codec import array_bytes, array_from_bytes
+from .files import atomic_write
+from .writer import BackgroundWriter
+from ..constants import JOURNAL_ORJSON_OPTIONS
+
+CHECKPOINT_FILE = "session.checkpoint"
+
+
+# The test that is being done, so it can be resumed after a crash.
+# A session is rebuilt from its event log (see event_log.py), so a checkpoint
+# is only the events recorded since the previous checkpoint and the time of the session,
+# appended as one line to session.checkpoint. The first line holds the settings of the test.
+# A line that was only half written when the app crashed is ignored.
+class CheckpointFile:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    @contextmanager
+    def batch(self):
+        yield
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    @contextmanager
+    def change(self):
+        yield
+
+    # A new file with the settings (the arguments of TestWidget) and the first checkpoint,
+    # it replaces the file of the previous session only once it's complete
+    def start(self, settings: dict, events: array, times: array, elapsed: int):
+        atomic_write(
+            self.path,
+            self.encode({"versi": 1, "pengaturan": settings})
+            + self.encode(self.checkpoint_record(events, times, elapsed)),
+        )
+        self.file = open(self.path, "ab")
+
+    def append(self, events: array, times: array, elapsed: int):
+        self.file.write(self.encode(self.checkpoint_record(events, times, elapsed)))
+
+    def checkpoint_record(self, events: array, times: array, elapsed: int) -> dict:
+        return {
+            "kejadian": base64.b64encode(array_bytes(events)).decode("ascii"),
+            "waktu": base64.b64encode(array_bytes(times)).decode("ascii"),
+            "durasi": elapsed,
+        }
+
+    def encode(self, record: dict) -> bytes:
+        return orjson.dumps(record, option=JOURNAL_ORJSON_OPTIONS) + b"\n"
+
+    # The session is over (saved or canceled)
+    def remove(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+# Settings and event log of the unfinished session in root_path, None if there is none
+# > pengaturan: the arguments of TestWidget
+# > log_kejadian, log_waktu: the event log up to the last checkpoint
+# > durasi: milliseconds since the start at the last checkpoint
+def read_checkpoint(root_path: str):
+    path = os.path.join(root_path, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return None
+
+    checkpoint = None
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                break
+            if checkpoint is None:
+                checkpoint = {
+                    "pengaturan": record["pengaturan"],
+                    "log_kejadian": array("I"),
+                    "log_waktu": array("I"),
+                    "durasi": 0,
+                }
+                continue
+            checkpoint["log_kejadian"] += array_from_bytes(
+                "I", base64.b64decode(record["kejadian"])
+            )
+            checkpoint["log_waktu"] += array_from_bytes(
+                "I", base64.b64decode(record["waktu"])
+            )
+            checkpoint["durasi"] = record["durasi"]
+
+    # Nothing to resume before the first checkpoint
+    if checkpoint is None or not checkpoint["log_kejadian"]:
+        return None
+    return checkpoint
+
+
+def remove_checkpoint(root_path: str):
+    path = os.path.join(root_path, CHECKPOINT_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+# Writes the checkpoints of one session with a BackgroundWriter, the GUI thread
+# only slices the new part of the event log, which doesn't depend on the question count
+class SessionCheckpointer:
+    def __init__(self, root_path: str, settings: dict, log, elapsed: int):
+        self.file = CheckpointFile(os.path.join(root_path, CHECKPOINT_FILE))
+        self.writer = BackgroundWriter(self.file)
+        self.written = len(log.events)  # events already in the file
+        self.writer.submit(
+            None, "start", settings, array("I", log.events), array("I", log.times), elapsed
+        )
+
+    def checkpoint(self, log, elapsed: int):
+        count = len(log.events)
+        self.writer.submit(
+            None,
+            "append",
+            log.events[self.written : count],
+            log.times[self.written : count],
+            elapsed,
+        )
+        self.written = count
+
+    # Stop writing, remove is True if the session is over
+    def close(self, remove: bool = False):
+        if remove:
+            self.writer.submit(None, "remove")
+        self.writer.close()
+        self.file.close()
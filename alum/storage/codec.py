@@ -0,0 +1,115 @@
+from array import array
+import base64
+import sys
+
+
+# Compact form of a test.
+# The per-question data is kept in arrays, indexed by the position of the question
+# (question number - nomor_pertama), instead of dicts keyed by the question number:
+# > jawaban: array("B") of option indices (index in opsi_soal), NO_ANSWER if empty
+# > kunci: array("B") of option indices, NO_ANSWER if empty
+# > waktu: array("I") of milliseconds spent on each question
+# waktu_total is in milliseconds too.
+# Tests saved with the event log of their session (see event_log.py) also have:
+# > log_kejadian, log_waktu: array("I") of the events and their times
+# > perubahan, kunjungan_ulang: array("H") of answer changes and revisits of each question
+# > waktu_jawab: array("I") of milliseconds until the first answer of each question
+# these are empty for the older tests.
+# The dict format (jawaban_tes, kunci_jawaban, waktu_yang_digunakan) is only
+# converted from when older data is imported, or when a finished test is saved.
+NO_ANSWER = 0xFF
+
+# Kept in a file (json backend) as base64 of the little endian bytes
+PACKED_ARRAYS = {
+    "jawaban": "B",
+    "kunci": "B",
+    "waktu": "I",
+    "log_kejadian": "I",
+    "log_waktu": "I",
+    "perubahan": "H",
+    "kunjungan_ulang": "H",
+    "waktu_jawab": "I",
+}
+LOG_ARRAYS = ("log_kejadian", "log_waktu", "perubahan", "kunjungan_ulang", "waktu_jawab")
+
+
+# dict format -> compact form
+# time_unit is the milliseconds in one unit of the times, they are seconds in the older data
+def encode_test(test_data: dict, time_unit: int = 1000) -> dict:
+    options = test_data["opsi_soal"]
+
+    def option_index(option: str) -> int:
+        return NO_ANSWER if option == "" else options.index(option)
+
+    time_spent = test_data["waktu_yang_digunakan"]
+    test = {
+        "batas_waktu": test_data["batas_waktu"],
+        "nomor_pertama": test_data["nomor_pertama"],
+        "jumlah_soal": test_data["jumlah_soal"],
+        "opsi_soal": options,
+        "jawaban": array(
+            "B", map(option_index, test_data["jawaban_tes"].values())
+        ),
+        "kunci": array("B", map(option_index, test_data["kunci_jawaban"].values())),
+        "waktu": array(
+            "I", (int(t) * time_unit for t in time_spent["per_soal"].values())
+        ),
+        "waktu_total": int(time_spent["total"]) * time_unit,
+        "tanggal_tes": test_data["tanggal_tes"],
+        "catatan_tes": test_data["catatan_tes"],
+    }
+    for key in LOG_ARRAYS:
+        test[key] = array(PACKED_ARRAYS[key])
+    return test
+
+
+# Little endian bytes of an array, how the arrays are written to the disk
+def array_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def array_from_bytes(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+# Compact form -> something orjson can write
+def pack_test(test: dict) -> dict:
+    packed = dict(test)
+    for key in PACKED_ARRAYS:
+        packed[key] = base64.b64encode(array_bytes(test[key])).decode("ascii")
+    return packed
+
+
+def unpack_test(packed: dict) -> dict:
+    # A test file written before the compact form
+    if "jawaban_tes" in packed:
+        return encode_test(packed)
+
+    # The log arrays are missing in the files written before the event log
+    test = dict(packed)
+    for key, typecode in PACKED_ARRAYS.items():
+        test[key] = array_from_bytes(typecode, base64.b64decode(packed.get(key, "")))
+    return test
+
+
+# Correct, incorrect and undetermined counts
+# an empty answer is incorrect, an empty answer key is undetermined
+def count_results(answers: array, keys: array) -> tuple:
+    correct_count = 0
+    undetermined_count = 0
+    for answer, key in zip(answers, keys):
+        if answer == NO_ANSWER:
+            continue
+        if key == NO_ANSWER:
+            undetermined_count += 1
+        elif answer == key:
+            correct_count += 1
+    incorrect_count = len(answers) - correct_count - undetermined_count
+    return correct_count, incorrect_count, undetermined_count
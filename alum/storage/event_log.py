@@ -0,0 +1,158 @@
+from array import array
+from bisect import bisect_right
+
+from .codec import NO_ANSWER
+
+
+# Everything the user does in a test session, in the order it happened.
+# An event is one integer: kind | value << KIND_BITS | idx << (KIND_BITS + VALUE_BITS)
+# > kind: one of the kinds below
+# > idx: position of the question (question number - nomor_pertama)
+# > value: option index for ANSWER (NO_ANSWER if the answer is removed),
+#   1 or 0 for DOUBT (marked or unmarked)
+# and its time is in milliseconds since the start of the session.
+# Both are appended to arrays, so recording an event creates no objects.
+START = 0
+FOCUS = 1  # question idx is shown
+ANSWER = 2
+DOUBT = 3
+PAUSE = 4
+RESUME = 5
+FINISH = 6
+
+KIND_BITS = 4
+VALUE_BITS = 8
+KIND_MASK = (1 << KIND_BITS) - 1
+VALUE_MASK = (1 << VALUE_BITS) - 1
+IDX_SHIFT = KIND_BITS + VALUE_BITS
+
+# waktu_jawab of a question that was never answered
+NO_TIME = 0xFFFFFFFF
+
+# LogReplay keeps a copy of the state every SNAPSHOT_INTERVAL events
+SNAPSHOT_INTERVAL = 256
+
+
+def decode_event(event: int) -> tuple:
+    return event & KIND_MASK, event >> IDX_SHIFT, (event >> KIND_BITS) & VALUE_MASK
+
+
+class EventLog:
+    def __init__(self):
+        self.events = array("I")
+        self.times = array("I")
+        self.start_ns = None
+
+    # now is a time.monotonic_ns timestamp, the first event starts the clock of the log
+    def record(self, now: int, kind: int, idx: int = 0, value: int = 0):
+        if self.start_ns is None:
+            self.start_ns = now
+        self.events.append(kind | value << KIND_BITS | idx << IDX_SHIFT)
+        self.times.append((now - self.start_ns) // 1_000_000)
+
+    # The fields of the compact form (see codec.py) for a test with question_counts questions
+    def test_fields(self, question_counts: int) -> dict:
+        return dict(
+            log_metrics(self.events, self.times, question_counts),
+            log_kejadian=array("I", self.events),
+            log_waktu=array("I", self.times),
+        )
+
+
+# Metrics of every question derived from the log, computed once when the test is saved:
+# > perubahan: how many times the answer was changed or removed after it was first answered,
+#   an ANSWER event with the answer the question already has is not a change
+# > kunjungan_ulang: how many times the question was shown again after the first time
+# > waktu_jawab: milliseconds from the start to the first answer, NO_TIME if never answered
+def log_metrics(events: array, times: array, question_counts: int) -> dict:
+    changes = array("H", bytes(2 * question_counts))
+    visits = array("H", bytes(2 * question_counts))
+    first_answer = array("I", [NO_TIME]) * question_counts
+    answers = array("B", [NO_ANSWER]) * question_counts
+
+    for event, time in zip(events, times):
+        kind = event & KIND_MASK
+        idx = event >> IDX_SHIFT
+        if kind == FOCUS:
+            visits[idx] += 1
+        elif kind == ANSWER:
+            answer = (event >> KIND_BITS) & VALUE_MASK
+            if answer == answers[idx]:
+                continue
+            answers[idx] = answer
+            if first_answer[idx] == NO_TIME:
+                first_answer[idx] = time
+            else:
+                changes[idx] += 1
+
+    revisits = array("H", (max(0, count - 1) for count in visits))
+    return {"perubahan": changes, "kunjungan_ulang": revisits, "waktu_jawab": first_answer}
+
+
+# State of a session at some moment of its log
+class ReplayState:
+    def __init__(self, question_counts: int):
+        self.focused = 0  # idx of the question that is shown
+        self.paused = False
+        self.finished = False
+        self.answers = array("B", [NO_ANSWER]) * question_counts
+        self.doubts = bytearray(question_counts)
+
+    def copy(self) -> "ReplayState":
+        state = ReplayState(0)
+        state.focused = self.focused
+        state.paused = self.paused
+        state.finished = self.finished
+        state.answers = array("B", self.answers)
+        state.doubts = bytearray(self.doubts)
+        return state
+
+    def apply(self, event: int):
+        kind = event & KIND_MASK
+        idx = event >> IDX_SHIFT
+        value = (event >> KIND_BITS) & VALUE_MASK
+        if kind == FOCUS:
+            self.focused = idx
+        elif kind == ANSWER:
+            self.answers[idx] = value
+        elif kind == DOUBT:
+            self.doubts[idx] = value
+        elif kind == PAUSE:
+            self.paused = True
+        elif kind == RESUME:
+            self.paused = False
+        elif kind == FINISH:
+            self.finished = True
+
+
+# Seek to any moment of a finished session.
+# The state is copied every SNAPSHOT_INTERVAL events when the replay is built,
+# a seek finds the events up to that moment by binary search on the times
+# and applies at most SNAPSHOT_INTERVAL events to the nearest snapshot before it.
+class LogReplay:
+    def __init__(self, events: array, times: array, question_counts: int):
+        self.events = events
+        self.times = times
+
+        # snapshots[i] is the state before event i * SNAPSHOT_INTERVAL
+        self.snapshots = []
+        state = ReplayState(question_counts)
+        for count, event in enumerate(events):
+            if count % SNAPSHOT_INTERVAL == 0:
+                self.snapshots.append(state.copy())
+            state.apply(event)
+        if len(events) % SNAPSHOT_INTERVAL == 0:
+            self.snapshots.append(state)
+
+    # Milliseconds from the start to the last event
+    def duration(self) -> int:
+        return self.times[-1] if self.times else 0
+
+    # Every event at or before time (milliseconds since the start) is applied
+    def state_at(self, time: int) -> ReplayState:
+        count = bisect_right(self.times, time)
+        snapshot_idx = count // SNAPSHOT_INTERVAL
+        state = self.snapshots[snapshot_idx].copy()
+        for event_idx in range(snapshot_idx * SNAPSHOT_INTERVAL, count):
+            state.apply(self.events[event_idx])
+        return state
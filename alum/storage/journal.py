@@ -0,0 +1,321 @@
+from contextlib import contextmanager
+import os
+import threading
+import uuid
+
+import orjson
+
+from .codec import encode_test, pack_test, unpack_test
+from .files import atomic_write
+from .repository import TestRepository, number_tests, test_entry, test_summary
+from ..constants import JOURNAL_COMPACT_THRESHOLD, JOURNAL_ORJSON_OPTIONS
+
+
+# Sharded storage for the test data (the "json" backend).
+# Every test is saved in its own file, tests/<berkas>.json, in the packed compact form,
+# and the test list is kept in a small manifest: id -> name, sort key, date and summary score.
+# Every change to the manifest is appended to manifest.journal as one small record
+# (one json per line), the manifest is rebuilt by replaying the records when the store is opened.
+# Once the journal gets too big, it is compacted in a background thread
+# into a single "snapshot" record.
+#
+# Records:
+# > {"op": "snapshot", "versi": 1, "tests": {id: entry, ...}}
+# > {"op": "add", "id": id, "entry": entry}
+# > {"op": "summary", "id": id, "summary": summary}
+# > {"op": "delete", "id": id}
+# > {"op": "rename", "id": id, "nama": new_name}
+# > {"op": "sort_key", "id": id, "urutan": sort_key}
+# > {"op": "order", "ids": [id, ...]}  (the sort keys become 0, 1, 2, ...)
+# entry is test_entry plus "berkas", the name of the test file.
+MANIFEST_VERSION = 1
+
+
+class JournalStore(TestRepository):
+    def __init__(self, root_path: str):
+        self.root_path = root_path
+        self.journal_path = os.path.join(root_path, "manifest.journal")
+        self.tests_path = os.path.join(root_path, "tests")
+
+        # id -> entry
+        self.manifest = {}
+        # berkas -> test data changed in the current batch, written at the end of the batch
+        self.dirty_tests = {}
+
+        self.lock = threading.Lock()
+        self.compact_thread = None
+        # Records appended while the compaction is running,
+        # they will be copied to the new journal
+        self.pending_records = None
+        # Size of the last snapshot and bytes appended after it
+        self.snapshot_size = 0
+        self.appended_size = 0
+        # fsync is done once at the end of a batch instead of after every record
+        self.in_batch = False
+
+        self.load()
+
+    # Rebuild the manifest from the journal, or import the older storage if there is no journal yet
+    def load(self):
+        if not os.path.exists(self.journal_path):
+            self.import_legacy()
+            return
+
+        with open(self.journal_path, "rb") as f:
+            content = f.read()
+
+        good_size = 0
+        for line in content.splitlines(keepends=True):
+            # A crash in the middle of an append leaves a broken last line,
+            # everything before it is still fine
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                break
+            self.apply(record)
+            good_size += len(line)
+
+            if record["op"] == "snapshot":
+                self.snapshot_size = len(line)
+                self.appended_size = 0
+            else:
+                self.appended_size += len(line)
+
+        # Cut the broken tail so the next append starts on a clean line
+        if good_size != len(content):
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good_size)
+
+        self.journal_file = open(self.journal_path, "ab")
+
+    # Split data.json into test files and write the first manifest
+    def import_legacy(self):
+        os.makedirs(self.tests_path, exist_ok=True)
+        manifest, tests = read_legacy_data(self.root_path)
+        for test_id, entry in manifest.items():
+            berkas = uuid.uuid4().hex
+            self.write_test(berkas, tests[test_id])
+            self.manifest[test_id] = dict(entry, berkas=berkas)
+
+        self.write_snapshot()
+
+    def write_snapshot(self):
+        snapshot = self.encode(self.snapshot_record())
+        atomic_write(self.journal_path, snapshot)
+        self.snapshot_size = len(snapshot)
+
+        self.journal_file = open(self.journal_path, "ab")
+
+    def snapshot_record(self) -> dict:
+        return {"op": "snapshot", "versi": MANIFEST_VERSION, "tests": self.manifest}
+
+    def encode(self, record: dict) -> bytes:
+        return orjson.dumps(record, option=JOURNAL_ORJSON_OPTIONS) + b"\n"
+
+    # Apply one record to self.manifest
+    def apply(self, record: dict):
+        op = record["op"]
+        if op == "snapshot":
+            # json keys are always str
+            self.manifest = {
+                int(test_id): entry for test_id, entry in record["tests"].items()
+            }
+        elif op == "add":
+            self.manifest[record["id"]] = record["entry"]
+        elif op == "summary":
+            self.manifest[record["id"]].update(record["summary"])
+        elif op == "delete":
+            self.manifest.pop(record["id"])
+        elif op == "rename":
+            self.manifest[record["id"]]["nama"] = record["nama"]
+        elif op == "sort_key":
+            self.manifest[record["id"]]["urutan"] = record["urutan"]
+        elif op == "order":
+            for sort_key, test_id in enumerate(record["ids"]):
+                self.manifest[test_id]["urutan"] = sort_key
+
+    # Write the record to the journal and then apply it
+    def append(self, record: dict):
+        line = self.encode(record)
+        with self.lock:
+            self.journal_file.write(line)
+            self.journal_file.flush()
+            if not self.in_batch:
+                os.fsync(self.journal_file.fileno())
+            if self.pending_records is not None:
+                self.pending_records.append(line)
+            self.appended_size += len(line)
+            self.apply(orjson.loads(line))
+
+        self.compact_if_needed()
+
+    # Changed test files are written once at the end of the batch
+    @contextmanager
+    def batch(self):
+        self.in_batch = True
+        try:
+            yield
+        finally:
+            self.in_batch = False
+            for berkas, test_data in self.dirty_tests.items():
+                self.write_test(berkas, test_data)
+            self.dirty_tests = {}
+            with self.lock:
+                os.fsync(self.journal_file.fileno())
+
+    ##########################################
+    # Test files
+    ##########################################
+    def test_path(self, berkas: str) -> str:
+        return os.path.join(self.tests_path, f"{berkas}.json")
+
+    def read_test(self, test_id: int) -> dict:
+        berkas = self.manifest[test_id]["berkas"]
+        if berkas in self.dirty_tests:
+            return self.dirty_tests[berkas]
+        with open(self.test_path(berkas), "rb") as f:
+            return unpack_test(orjson.loads(f.read()))
+
+    def write_test(self, berkas: str, test_data: dict):
+        atomic_write(
+            self.test_path(berkas),
+            orjson.dumps(pack_test(test_data), option=JOURNAL_ORJSON_OPTIONS),
+        )
+
+    # Save the changed test, and its new summary if the score changed,
+    # the summary is counted from the test data if it's not given
+    def save_test(self, test_id: int, test_data: dict, summary: dict = None):
+        berkas = self.manifest[test_id]["berkas"]
+        if self.in_batch:
+            self.dirty_tests[berkas] = test_data
+        else:
+            self.write_test(berkas, test_data)
+
+        if summary is None:
+            summary = test_summary(test_data)
+        entry = self.manifest[test_id]
+        if any(entry.get(key) != value for key, value in summary.items()):
+            self.append({"op": "summary", "id": test_id, "summary": summary})
+
+    ##########################################
+    # Reads
+    ##########################################
+    def load_manifest(self) -> dict:
+        entries = sorted(self.manifest.items(), key=lambda item: item[1]["urutan"])
+        return {
+            test_id: {key: value for key, value in entry.items() if key != "berkas"}
+            for test_id, entry in entries
+        }
+
+    def load_all(self) -> dict:
+        return {test_id: self.read_test(test_id) for test_id in self.load_manifest()}
+
+    def get_test(self, test_id: int) -> dict:
+        return self.read_test(test_id)
+
+    ##########################################
+    # Changes
+    ##########################################
+    # The test file is written before the manifest points to it
+    def add_test(self, test_id: int, name: str, sort_key: float, test_data: dict):
+        os.makedirs(self.tests_path, exist_ok=True)
+        berkas = uuid.uuid4().hex
+        self.write_test(berkas, test_data)
+        entry = dict(test_entry(name, sort_key, test_data), berkas=berkas)
+        self.append({"op": "add", "id": test_id, "entry": entry})
+
+    def set_note(self, test_id: int, note: str):
+        test_data = self.read_test(test_id)
+        test_data["catatan_tes"] = note
+        self.save_test(test_id, test_data)
+
+    def set_first_num(self, test_id: int, first_num: int):
+        test_data = self.read_test(test_id)
+        test_data["nomor_pertama"] = first_num
+        self.save_test(test_id, test_data)
+
+    def set_answer_key(self, test_id: int, idx: int, answer_key: int, summary: dict):
+        test_data = self.read_test(test_id)
+        test_data["kunci"][idx] = answer_key
+        self.save_test(test_id, test_data, summary)
+
+    # The test file is removed after the manifest no longer points to it
+    def delete_test(self, test_id: int):
+        berkas = self.manifest[test_id]["berkas"]
+        self.append({"op": "delete", "id": test_id})
+        self.dirty_tests.pop(berkas, None)
+        os.remove(self.test_path(berkas))
+
+    def rename_test(self, test_id: int, new_name: str):
+        self.append({"op": "rename", "id": test_id, "nama": new_name})
+
+    def set_sort_key(self, test_id: int, sort_key: float):
+        self.append({"op": "sort_key", "id": test_id, "urutan": sort_key})
+
+    def set_order(self, test_ids: list):
+        self.append({"op": "order", "ids": list(test_ids)})
+
+    ##########################################
+    # Compaction
+    ##########################################
+    def compact_if_needed(self):
+        if self.compact_thread is not None and self.compact_thread.is_alive():
+            return
+        threshold = max(JOURNAL_COMPACT_THRESHOLD, self.snapshot_size)
+        if self.appended_size < threshold:
+            return
+
+        self.compact_thread = threading.Thread(target=self.compact, daemon=True)
+        self.compact_thread.start()
+
+    # Runs in the background thread
+    def compact(self):
+        tmp_path = self.journal_path + ".tmp"
+
+        # Serializing holds the GIL, so the manifest can't change in the middle of it,
+        # records appended after this point are collected in pending_records
+        with self.lock:
+            snapshot = self.encode(self.snapshot_record())
+            self.pending_records = []
+
+        with open(tmp_path, "wb") as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self.lock:
+            with open(tmp_path, "ab") as f:
+                for line in self.pending_records:
+                    f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+            self.journal_file.close()
+            os.replace(tmp_path, self.journal_path)
+            self.journal_file = open(self.journal_path, "ab")
+
+            self.snapshot_size = len(snapshot)
+            self.appended_size = sum(len(line) for line in self.pending_records)
+            self.pending_records = None
+
+    # Wait for the compaction and close the journal
+    def close(self):
+        if self.compact_thread is not None:
+            self.compact_thread.join()
+        with self.lock:
+            self.journal_file.close()
+
+
+# Test data of the older storage (data.json in root_path) as (manifest, tests),
+# see number_tests, empty if there is no data.json
+def read_legacy_data(root_path: str) -> tuple:
+    json_path = os.path.join(root_path, "data.json")
+
+    data = {}
+    if os.path.exists(json_path):
+        with open(json_path, "rb") as f:
+            data = orjson.loads(f.read())
+
+    return number_tests(
+        {name: encode_test(test_data) for name, test_data in data.items()}
+    )
@@ -0,0 +1,56 @@
+import re
+
+# "12. A", "12) a", "12 A", "12,A", "12;A", "12<tab>A"
+NUMBERED_LINE = re.compile(r"\s*(\d+)\s*[.):,;\t ]\s*(\S*)\s*$")
+# Separators between the options of an unnumbered line ("ABCDE", "A B C", "A,B,C")
+SEPARATORS = re.compile(r"[\s,;]+")
+# Placeholder for a question without answer key in an unnumbered line
+SKIP = "-"
+
+
+# Answer keys pasted or read from a file (TXT or CSV), read one line at a time,
+# so a file object is never read as a whole. Every line is either:
+# > numbered, "1. A", the answer key of that question
+# > a run of options, "ABCDEA" (or "A B C", "A,B,C", "-" to skip a question),
+#   for the questions after the last one that was read, starting from first_num
+# Return (number -> option, [(line number, line, reason), ...] of the bad lines),
+# a bad line is left out but the lines after it are still read
+def parse_answer_keys(lines, options, first_num: int, last_num: int) -> tuple:
+    option_of = {option.lower(): option for option in options}
+    answer_keys = {}
+    errors = []
+    next_num = first_num
+
+    for line_num, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if line.strip() == "":
+            continue
+
+        numbered = NUMBERED_LINE.match(line)
+        if numbered:
+            num = int(numbered.group(1))
+            option = option_of.get(numbered.group(2).lower())
+            if not first_num <= num <= last_num:
+                errors.append((line_num, line, f"nomor {num} tidak ada dalam tes"))
+            elif option is None:
+                errors.append((line_num, line, "opsi tidak dikenal"))
+            else:
+                answer_keys[num] = option
+                next_num = num + 1
+            continue
+
+        # Unnumbered, the whole line is checked before any of it is used
+        run = "".join(SEPARATORS.split(line.strip()))
+        unknown = [char for char in run if char != SKIP and char.lower() not in option_of]
+        if unknown:
+            errors.append((line_num, line, f"opsi tidak dikenal: {''.join(unknown)}"))
+            continue
+        if next_num + len(run) - 1 > last_num:
+            errors.append((line_num, line, "melebihi jumlah soal"))
+            continue
+        for char in run:
+            if char != SKIP:
+                answer_keys[next_num] = option_of[char.lower()]
+            next_num += 1
+
+    return answer_keys, errors
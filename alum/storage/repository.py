@@ -0,0 +1,182 @@
+from contextlib import contextmanager
+import os
+
+from .codec import NO_ANSWER, count_results
+from ..constants import STORAGE_BACKEND
+
+
+# Persistence interface behind DataStore.
+# Tests are identified by an id that never changes, the name is just a field,
+# and the test list is sorted by "urutan", a float sort key,
+# so a rename or moving a test only changes one field of one test.
+# Test data is always in the compact form (see codec.py)
+class TestRepository:
+    # id -> entry (see test_entry) sorted by urutan,
+    # this is all the home screen needs, the test data is only loaded by get_test
+    def load_manifest(self) -> dict:
+        raise NotImplementedError
+
+    # All tests in one go, id -> test data sorted by urutan
+    def load_all(self) -> dict:
+        raise NotImplementedError
+
+    def get_test(self, test_id: int) -> dict:
+        raise NotImplementedError
+
+    # The id is chosen by the caller (DataStore)
+    def add_test(self, test_id: int, name: str, sort_key: float, test_data: dict):
+        raise NotImplementedError
+
+    def set_note(self, test_id: int, note: str):
+        raise NotImplementedError
+
+    def set_first_num(self, test_id: int, first_num: int):
+        raise NotImplementedError
+
+    # idx is the position of the question, answer_key the index of the option,
+    # summary is the summary of the test after the change (see summary_with_question)
+    def set_answer_key(self, test_id: int, idx: int, answer_key: int, summary: dict):
+        raise NotImplementedError
+
+    def rename_test(self, test_id: int, new_name: str):
+        raise NotImplementedError
+
+    def delete_test(self, test_id: int):
+        raise NotImplementedError
+
+    def set_sort_key(self, test_id: int, sort_key: float):
+        raise NotImplementedError
+
+    # Give every test a new sort key: 0, 1, 2, ... in the order of test_ids
+    def set_order(self, test_ids: list):
+        raise NotImplementedError
+
+    # Changes made inside the batch are committed together
+    @contextmanager
+    def batch(self):
+        yield
+
+    # One change inside a batch, if it fails only this change is undone
+    @contextmanager
+    def change(self):
+        yield
+
+    def close(self):
+        pass
+
+
+# Fields of the summary, see test_summary
+SUMMARY_KEYS = (
+    "tanggal_tes",
+    "jumlah_soal",
+    "benar",
+    "salah",
+    "tidak_tentu",
+    "jawaban_per_opsi",
+    "kunci_per_opsi",
+    "waktu_total",
+)
+
+
+# Small summary of a test that is kept in the test list:
+# > benar, salah, tidak_tentu: correct, incorrect and undetermined counts (see count_results)
+# > jawaban_per_opsi, kunci_per_opsi: how many answers and answer keys are each option,
+#   by the index of the option
+# > waktu_total: time spent on the whole test, in milliseconds
+# It's counted from the whole test only when the test is saved,
+# a change of one question updates it with summary_with_question
+def test_summary(test_data: dict) -> dict:
+    correct_count, incorrect_count, undetermined_count = count_results(
+        test_data["jawaban"], test_data["kunci"]
+    )
+    options = range(len(test_data["opsi_soal"]))
+
+    return {
+        "tanggal_tes": test_data["tanggal_tes"],
+        "jumlah_soal": test_data["jumlah_soal"],
+        "benar": correct_count,
+        "salah": incorrect_count,
+        "tidak_tentu": undetermined_count,
+        "jawaban_per_opsi": [test_data["jawaban"].count(idx) for idx in options],
+        "kunci_per_opsi": [test_data["kunci"].count(idx) for idx in options],
+        "waktu_total": test_data["waktu_total"],
+    }
+
+
+# Which count of the summary a question is in, the same rules as count_results
+def result_key(answer: int, answer_key: int) -> str:
+    if answer == NO_ANSWER:
+        return "salah"
+    if answer_key == NO_ANSWER:
+        return "tidak_tentu"
+    return "benar" if answer == answer_key else "salah"
+
+
+# New summary after the answer and answer key of one question changed,
+# only the counts of that question are moved, the old summary is left as it is
+def summary_with_question(
+    summary: dict, old_answer: int, old_key: int, new_answer: int, new_key: int
+) -> dict:
+    summary = dict(
+        summary,
+        jawaban_per_opsi=list(summary["jawaban_per_opsi"]),
+        kunci_per_opsi=list(summary["kunci_per_opsi"]),
+    )
+    for answer, answer_key, delta in (
+        (old_answer, old_key, -1),
+        (new_answer, new_key, 1),
+    ):
+        summary[result_key(answer, answer_key)] += delta
+        if answer != NO_ANSWER:
+            summary["jawaban_per_opsi"][answer] += delta
+        if answer_key != NO_ANSWER:
+            summary["kunci_per_opsi"][answer_key] += delta
+    return summary
+
+
+# What the test list knows about a test: name, sort key and summary
+def test_entry(name: str, sort_key: float, test_data: dict) -> dict:
+    return dict(test_summary(test_data), nama=name, urutan=sort_key)
+
+
+# name -> test data (from the older storage) into (manifest, tests) keyed by new ids,
+# the ids and sort keys follow the order of data
+def number_tests(data: dict) -> tuple:
+    manifest = {}
+    tests = {}
+    for test_id, (name, test_data) in enumerate(data.items()):
+        manifest[test_id] = test_entry(name, test_id, test_data)
+        tests[test_id] = test_data
+    return manifest, tests
+
+
+# Open the repository for the data in root_path,
+# a new SQLite database is filled with the data of the older storage
+# (the manifest.journal of the json backend, or the older data.json)
+def open_repository(root_path: str, backend: str = STORAGE_BACKEND) -> TestRepository:
+    from .journal import JournalStore, read_legacy_data
+    from .sqlite_repository import SqliteRepository
+
+    if backend == "json":
+        return JournalStore(root_path)
+
+    db_path = os.path.join(root_path, "data.db")
+    if not os.path.exists(db_path):
+        # The new database is built under another name and renamed when it's complete,
+        # so a crash in the middle of the import is retried on the next run
+        tmp_path = db_path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        repo = SqliteRepository(tmp_path)
+
+        if os.path.exists(os.path.join(root_path, "manifest.journal")):
+            journal = JournalStore(root_path)
+            repo.import_tests(journal.load_manifest(), journal.load_all())
+            journal.close()
+        else:
+            repo.import_tests(*read_legacy_data(root_path))
+
+        repo.close()
+        os.replace(tmp_path, db_path)
+
+    return SqliteRepository(db_path)
@@ -0,0 +1,360 @@
+from array import array
+from itertools import repeat
+from contextlib import contextmanager
+from datetime import datetime
+import sqlite3
+
+from .codec import array_bytes, array_from_bytes
+from .repository import TestRepository, test_summary
+from ..constants import TIME_FORMAT
+
+
+# tanggal_tes is saved as ISO text so the date index is sorted chronologically
+ISO_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE tests (
+    id INTEGER PRIMARY KEY,
+    nama TEXT NOT NULL UNIQUE,
+    urutan REAL NOT NULL,
+    tanggal_tes TEXT NOT NULL,
+    batas_waktu INTEGER NOT NULL,
+    nomor_pertama INTEGER NOT NULL,
+    jumlah_soal INTEGER NOT NULL,
+    opsi_soal TEXT NOT NULL,
+    waktu_total INTEGER NOT NULL,
+    catatan_tes TEXT NOT NULL,
+    log_kejadian BLOB NOT NULL,
+    log_waktu BLOB NOT NULL,
+    benar INTEGER NOT NULL,
+    salah INTEGER NOT NULL,
+    tidak_tentu INTEGER NOT NULL,
+    jawaban_per_opsi TEXT NOT NULL,
+    kunci_per_opsi TEXT NOT NULL
+);
+CREATE INDEX tests_urutan ON tests (urutan);
+CREATE INDEX tests_tanggal_tes ON tests (tanggal_tes);
+
+CREATE TABLE soal (
+    test_id INTEGER NOT NULL REFERENCES tests (id) ON DELETE CASCADE,
+    indeks INTEGER NOT NULL,
+    jawaban INTEGER NOT NULL,
+    kunci INTEGER NOT NULL,
+    waktu INTEGER NOT NULL,
+    perubahan INTEGER,
+    kunjungan_ulang INTEGER,
+    waktu_jawab INTEGER,
+    PRIMARY KEY (test_id, indeks)
+) WITHOUT ROWID;
+"""
+# The UNIQUE constraint on tests.nama is the name index.
+# soal is the compact form (see codec.py): indeks is the position of the question,
+# jawaban and kunci are option indices (255 if empty), waktu and tests.waktu_total are in milliseconds
+# The event log is kept as the little endian bytes of its arrays,
+# perubahan, kunjungan_ulang and waktu_jawab are NULL for the tests saved without it.
+# benar, salah, tidak_tentu, jawaban_per_opsi and kunci_per_opsi are the summary (see test_summary),
+# the counts per option are kept as text like opsi_soal ("3,0,5,2,1")
+
+TEST_COLUMNS = (
+    "id, nama, tanggal_tes, batas_waktu, nomor_pertama, jumlah_soal, "
+    "opsi_soal, waktu_total, catatan_tes, log_kejadian, log_waktu"
+)
+QUESTION_COLUMNS = "jawaban, kunci, waktu, perubahan, kunjungan_ulang, waktu_jawab"
+
+
+class SqliteRepository(TestRepository):
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # Only the background writer uses the connection after the data is loaded
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Nested transactions, only the outermost one commits
+        self.transaction_depth = 0
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+
+        # Create the tables of a new database in one transaction together with its user_version
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+            self.conn.executescript(
+                f"BEGIN; {SCHEMA} PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;"
+            )
+
+    @contextmanager
+    def transaction(self):
+        self.transaction_depth += 1
+        # Started explicitly, so the savepoints of change() stay inside it
+        if self.transaction_depth == 1 and not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            if self.transaction_depth == 1:
+                self.conn.rollback()
+            raise
+        else:
+            if self.transaction_depth == 1:
+                self.conn.commit()
+        finally:
+            self.transaction_depth -= 1
+
+    def batch(self):
+        return self.transaction()
+
+    @contextmanager
+    def change(self):
+        self.conn.execute("SAVEPOINT change")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK TO change")
+            self.conn.execute("RELEASE change")
+            raise
+        else:
+            self.conn.execute("RELEASE change")
+
+    # Fill an empty database with the tests of the older storage,
+    # manifest and tests as from load_manifest and load_all
+    def import_tests(self, manifest: dict, tests: dict):
+        with self.transaction():
+            for test_id, entry in manifest.items():
+                self.insert_test(
+                    test_id, entry["nama"], entry["urutan"], tests[test_id]
+                )
+
+    def insert_test(self, test_id: int, name: str, sort_key: float, test_data: dict):
+        self.conn.execute(
+            """
+            INSERT INTO tests (
+                tanggal_tes, batas_waktu, nomor_pertama, jumlah_soal,
+                opsi_soal, waktu_total, catatan_tes, log_kejadian, log_waktu,
+                benar, salah, tidak_tentu, jawaban_per_opsi, kunci_per_opsi,
+                id, nama, urutan
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (*self.test_values(test_data), test_id, name, sort_key),
+        )
+        self.insert_questions(test_id, test_data)
+
+    # Values of the tests table columns, except id, nama and urutan
+    def test_values(self, test_data: dict) -> tuple:
+        tests_date = datetime.strptime(test_data["tanggal_tes"], TIME_FORMAT)
+        return (
+            tests_date.strftime(ISO_TIME_FORMAT),
+            test_data["batas_waktu"],
+            test_data["nomor_pertama"],
+            test_data["jumlah_soal"],
+            ",".join(test_data["opsi_soal"]),
+            test_data["waktu_total"],
+            test_data["catatan_tes"],
+            array_bytes(test_data["log_kejadian"]),
+            array_bytes(test_data["log_waktu"]),
+            *self.summary_values(test_summary(test_data)),
+        )
+
+    # Values of the summary columns, benar to kunci_per_opsi
+    def summary_values(self, summary: dict) -> tuple:
+        return (
+            summary["benar"],
+            summary["salah"],
+            summary["tidak_tentu"],
+            ",".join(map(str, summary["jawaban_per_opsi"])),
+            ",".join(map(str, summary["kunci_per_opsi"])),
+        )
+
+    def insert_questions(self, test_id: int, test_data: dict):
+        # The metrics are empty for a test without the event log
+        per_question = zip(
+            test_data["jawaban"],
+            test_data["kunci"],
+            test_data["waktu"],
+            test_data["perubahan"] or repeat(None),
+            test_data["kunjungan_ulang"] or repeat(None),
+            test_data["waktu_jawab"] or repeat(None),
+        )
+        self.conn.executemany(
+            f"INSERT INTO soal (test_id, indeks, {QUESTION_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((test_id, idx, *question) for idx, question in enumerate(per_question)),
+        )
+
+    ##########################################
+    # Reads
+    ##########################################
+    def load_manifest(self) -> dict:
+        rows = self.conn.execute(
+            """
+            SELECT
+                id, nama, urutan, tanggal_tes, jumlah_soal,
+                benar, salah, tidak_tentu, jawaban_per_opsi, kunci_per_opsi, waktu_total
+            FROM tests ORDER BY urutan
+            """
+        )
+        return {
+            test_id: {
+                "tanggal_tes": datetime.strptime(tests_date, ISO_TIME_FORMAT).strftime(
+                    TIME_FORMAT
+                ),
+                "jumlah_soal": question_counts,
+                "benar": correct_count,
+                "salah": incorrect_count,
+                "tidak_tentu": undetermined_count,
+                "jawaban_per_opsi": [int(count) for count in answer_counts.split(",")],
+                "kunci_per_opsi": [int(count) for count in key_counts.split(",")],
+                "waktu_total": total_time,
+                "nama": name,
+                "urutan": sort_key,
+            }
+            for (
+                test_id,
+                name,
+                sort_key,
+                tests_date,
+                question_counts,
+                correct_count,
+                incorrect_count,
+                undetermined_count,
+                answer_counts,
+                key_counts,
+                total_time,
+            ) in rows
+        }
+
+    def get_test(self, test_id: int) -> dict:
+        row = self.conn.execute(
+            f"SELECT {TEST_COLUMNS} FROM tests WHERE id = ?", (test_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(test_id)
+        questions = self.conn.execute(
+            f"SELECT {QUESTION_COLUMNS} FROM soal WHERE test_id = ? ORDER BY indeks",
+            (test_id,),
+        )
+        return self.test_from_rows(row, questions)
+
+    # Two queries for all the tests instead of two queries for each test
+    def load_all(self) -> dict:
+        questions = {}
+        rows = self.conn.execute(
+            f"SELECT test_id, {QUESTION_COLUMNS} FROM soal ORDER BY test_id, indeks"
+        )
+        for test_id, *question in rows:
+            questions.setdefault(test_id, []).append(question)
+
+        data = {}
+        rows = self.conn.execute(f"SELECT {TEST_COLUMNS} FROM tests ORDER BY urutan")
+        for row in rows:
+            data[row[0]] = self.test_from_rows(row, questions.get(row[0], ()))
+        return data
+
+    # Build the test data from a row of TEST_COLUMNS and its soal rows
+    def test_from_rows(self, row: tuple, questions) -> dict:
+        (
+            _,
+            _,
+            tests_date,
+            time_limit,
+            first_num,
+            question_counts,
+            options,
+            total_time,
+            note,
+            log_events,
+            log_times,
+        ) = row
+        tests_date = datetime.strptime(tests_date, ISO_TIME_FORMAT)
+
+        test_answers = array("B")
+        answer_keys = array("B")
+        time_spent = array("I")
+        changes = array("H")
+        revisits = array("H")
+        first_answer = array("I")
+        for answer, key, time, change_count, revisit_count, answer_time in questions:
+            test_answers.append(answer)
+            answer_keys.append(key)
+            time_spent.append(time)
+            if change_count is not None:
+                changes.append(change_count)
+                revisits.append(revisit_count)
+                first_answer.append(answer_time)
+
+        return {
+            "batas_waktu": time_limit,
+            "nomor_pertama": first_num,
+            "jumlah_soal": question_counts,
+            "opsi_soal": options.split(","),
+            "jawaban": test_answers,
+            "kunci": answer_keys,
+            "waktu": time_spent,
+            "waktu_total": total_time,
+            "tanggal_tes": tests_date.strftime(TIME_FORMAT),
+            "catatan_tes": note,
+            "log_kejadian": array_from_bytes("I", log_events),
+            "log_waktu": array_from_bytes("I", log_times),
+            "perubahan": changes,
+            "kunjungan_ulang": revisits,
+            "waktu_jawab": first_answer,
+        }
+
+    ##########################################
+    # Changes
+    ##########################################
+    def add_test(self, test_id: int, name: str, sort_key: float, test_data: dict):
+        with self.transaction():
+            self.insert_test(test_id, name, sort_key, test_data)
+
+    def set_note(self, test_id: int, note: str):
+        with self.transaction():
+            self.conn.execute(
+                "UPDATE tests SET catatan_tes = ? WHERE id = ?", (note, test_id)
+            )
+
+    # soal rows are keyed by their position, so they stay the same
+    def set_first_num(self, test_id: int, first_num: int):
+        with self.transaction():
+            self.conn.execute(
+                "UPDATE tests SET nomor_pertama = ? WHERE id = ?", (first_num, test_id)
+            )
+
+    # One soal row and the summary of the test, nothing is counted again
+    def set_answer_key(self, test_id: int, idx: int, answer_key: int, summary: dict):
+        with self.transaction():
+            self.conn.execute(
+                "UPDATE soal SET kunci = ? WHERE test_id = ? AND indeks = ?",
+                (answer_key, test_id, idx),
+            )
+            self.conn.execute(
+                """
+                UPDATE tests SET
+                    benar = ?, salah = ?, tidak_tentu = ?,
+                    jawaban_per_opsi = ?, kunci_per_opsi = ?
+                WHERE id = ?
+                """,
+                (*self.summary_values(summary), test_id),
+            )
+
+    def rename_test(self, test_id: int, new_name: str):
+        with self.transaction():
+            self.conn.execute(
+                "UPDATE tests SET nama = ? WHERE id = ?", (new_name, test_id)
+            )
+
+    # The questions are deleted by ON DELETE CASCADE
+    def delete_test(self, test_id: int):
+        with self.transaction():
+            self.conn.execute("DELETE FROM tests WHERE id = ?", (test_id,))
+
+    def set_sort_key(self, test_id: int, sort_key: float):
+        with self.transaction():
+            self.conn.execute(
+                "UPDATE tests SET urutan = ? WHERE id = ?", (sort_key, test_id)
+            )
+
+    def set_order(self, test_ids: list):
+        with self.transaction():
+            self.conn.executemany(
+                "UPDATE tests SET urutan = ? WHERE id = ?",
+                ((sort_key, test_id) for sort_key, test_id in enumerate(test_ids)),
+            )
+
+    def close(self):
+        self.conn.close()
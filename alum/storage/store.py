@@ -0,0 +1,303 @@
+import os
+import threading
+
+from PySide6.QtCore import QObject, Signal
+
+from .aggregates import (
+    AGGREGATES_FILE,
+    AggregatesFile,
+    HistoryAggregates,
+    read_aggregates,
+    test_row,
+)
+from .repository import (
+    SUMMARY_KEYS,
+    TestRepository,
+    open_repository,
+    summary_with_question,
+    test_summary,
+)
+from .writer import BackgroundWriter
+
+
+# Process-wide owner of the test data.
+# Only the manifest (name, order, and summary of every test) is loaded at the start,
+# the test data is loaded from the repository the first time a test is opened.
+# Widgets read from memory and every change is applied in memory first
+# and then persisted to the repository by the background writer.
+# Tests are referred to by their id from the repository, the name is only looked up
+# through name_index, and the order comes from the sort keys, so a rename or moving a test
+# only changes one field of one test.
+# Every change is announced with a signal, so the widgets only update what changed.
+class DataStore(QObject):
+    _instance = None
+
+    # Signals, all with the id of the test
+    testAdded = Signal(int)
+    testRemoved = Signal(int)
+    testRenamed = Signal(int)
+    testMoved = Signal(int)
+    # The test data changed (answer key, note, ...)
+    testChanged = Signal(int)
+    # The statistics of the whole history changed (see aggregates.py)
+    aggregatesChanged = Signal()
+    # A change couldn't be written to the repository, with the error message.
+    # It's kept in memory and tried again (see BackgroundWriter)
+    writeFailed = Signal(str)
+    # The history asked for with load_history (see analytics.py)
+    historyLoaded = Signal(object)
+
+    # Open the store for the data in root_path, it will be available with instance()
+    @classmethod
+    def open(cls, root_path: str) -> "DataStore":
+        cls._instance = cls(open_repository(root_path), root_path)
+        return cls._instance
+
+    @classmethod
+    def instance(cls) -> "DataStore":
+        return cls._instance
+
+    def __init__(self, repo: TestRepository, root_path: str = None):
+        super().__init__()
+        self.repo = repo
+        # Where the other files of the app are kept (ex: the checkpoint of a test session)
+        self.root_path = root_path
+
+        self.summaries = {}  # id -> summary
+        self.tests = {}  # id -> test data, only for the opened tests
+        self.names = {}  # id -> name
+        self.name_index = {}  # name -> id
+        self.sort_keys = {}  # id -> sort key
+        self.order = []  # ids sorted by the sort keys
+        self.next_id = 0
+
+        self.load()
+        self.writer = BackgroundWriter(self.repo, on_error=self.report_write_error)
+        self.load_aggregates()
+
+    def load(self):
+        for test_id, entry in self.repo.load_manifest().items():
+            self.names[test_id] = entry["nama"]
+            self.name_index[entry["nama"]] = test_id
+            self.sort_keys[test_id] = entry["urutan"]
+            self.summaries[test_id] = {key: entry[key] for key in SUMMARY_KEYS}
+            self.order.append(test_id)
+            self.next_id = max(self.next_id, test_id + 1)
+
+    # Called from the writer thread, the signal is delivered in the GUI thread
+    def report_write_error(self, error: Exception):
+        self.writeFailed.emit(str(error))
+
+    ##########################################
+    # History aggregates
+    ##########################################
+    # The aggregates are loaded from AGGREGATES_FILE, and only the rows that don't match
+    # the summaries of the manifest are built again (ex: a change was saved right before
+    # a crash), no test data is read. The file is written again if any row was
+    def load_aggregates(self):
+        record = read_aggregates(self.root_path) if self.root_path is not None else None
+        if record is None:
+            self.aggregates = HistoryAggregates()
+        else:
+            self.aggregates = HistoryAggregates.from_record(record)
+
+        stale = record is None
+        for test_id in [i for i in self.aggregates.rows if i not in self.summaries]:
+            self.aggregates.remove(test_id)
+            stale = True
+        for test_id in self.order:
+            row = test_row(self.summaries[test_id])
+            if self.aggregates.rows.get(test_id) != row:
+                self.aggregates.replace(test_id, row)
+                stale = True
+
+        # Without root_path (no place for the file) they are only kept in memory
+        self.aggregates_writer = None
+        if self.root_path is not None:
+            self.aggregates_writer = BackgroundWriter(
+                AggregatesFile(os.path.join(self.root_path, AGGREGATES_FILE))
+            )
+            if stale:
+                self.save_aggregates()
+
+    # The row of a new or changed test
+    def update_aggregates(self, test_id: int):
+        self.aggregates.replace(test_id, test_row(self.summaries[test_id]))
+        self.save_aggregates()
+
+    def save_aggregates(self):
+        if self.aggregates_writer is not None:
+            self.aggregates_writer.submit(
+                ("aggregates",), "write", self.aggregates.to_dict()
+            )
+        self.aggregatesChanged.emit()
+
+    ##########################################
+    # Reads
+    ##########################################
+    def test_ids(self) -> list:
+        return list(self.order)
+
+    def get_test(self, test_id: int) -> dict:
+        if test_id not in self.tests:
+            # The repository has to be up to date with this test before reading it
+            self.writer.flush()
+            self.tests[test_id] = self.repo.get_test(test_id)
+        return self.tests[test_id]
+
+    # Every saved test at once for the statistics of the whole history (see analytics.py),
+    # numpy is only imported the first time the history is needed
+    def history(self):
+        from .analytics import TestHistory
+
+        self.writer.flush()
+        return TestHistory(self.repo.load_all())
+
+    # Build the history in a background thread, every test is read for it,
+    # historyLoaded is emitted with it in the GUI thread
+    def load_history(self):
+        threading.Thread(
+            target=lambda: self.historyLoaded.emit(self.history()), daemon=True
+        ).start()
+
+    # Forget the test data of a closed test, it will be loaded again when needed
+    def unload_test(self, test_id: int):
+        self.tests.pop(test_id, None)
+
+    def get_summary(self, test_id: int) -> dict:
+        return self.summaries[test_id]
+
+    def get_name(self, test_id: int) -> str:
+        return self.names[test_id]
+
+    def find_test(self, name: str):
+        return self.name_index.get(name)
+
+    def has_name(self, name: str) -> bool:
+        return name in self.name_index
+
+    ##########################################
+    # Changes
+    ##########################################
+    # New test is added as the first test, return the id of the test
+    def add_test(self, name: str, test_data: dict) -> int:
+        test_id = self.next_id
+        self.next_id += 1
+        sort_key = self.sort_keys[self.order[0]] - 1 if self.order else 0
+
+        self.names[test_id] = name
+        self.name_index[name] = test_id
+        self.sort_keys[test_id] = sort_key
+        self.tests[test_id] = test_data
+        self.summaries[test_id] = test_summary(test_data)
+        self.order.insert(0, test_id)
+
+        self.writer.submit(None, "add_test", test_id, name, sort_key, test_data)
+        self.update_aggregates(test_id)
+        self.testAdded.emit(test_id)
+        return test_id
+
+    def set_note(self, test_id: int, note: str):
+        self.get_test(test_id)["catatan_tes"] = note
+        self.writer.submit(("note", test_id), "set_note", test_id, note)
+        self.testChanged.emit(test_id)
+
+    # Only the offset changes, the questions are kept by their position
+    def set_first_num(self, test_id: int, first_num: int):
+        self.get_test(test_id)["nomor_pertama"] = first_num
+        self.writer.submit(
+            ("first_num", test_id), "set_first_num", test_id, first_num
+        )
+        self.testChanged.emit(test_id)
+
+    # idx is the position of the question, answer_key the index of the option,
+    # the summary is updated from the old and new answer key of this question only
+    def set_answer_key(self, test_id: int, idx: int, answer_key: int):
+        test_data = self.get_test(test_id)
+        answer = test_data["jawaban"][idx]
+        summary = summary_with_question(
+            self.summaries[test_id], answer, test_data["kunci"][idx], answer, answer_key
+        )
+        test_data["kunci"][idx] = answer_key
+        self.summaries[test_id] = summary
+        self.writer.submit(
+            ("answer_key", test_id, idx),
+            "set_answer_key",
+            test_id,
+            idx,
+            answer_key,
+            summary,
+        )
+        self.update_aggregates(test_id)
+        self.testChanged.emit(test_id)
+
+    def rename_test(self, test_id: int, new_name: str):
+        old_name = self.names[test_id]
+        del self.name_index[old_name]
+        self.name_index[new_name] = test_id
+        self.names[test_id] = new_name
+
+        # Never merged, a later rename of this test must not move it behind the rename
+        # of another test that takes the old name of this one
+        self.writer.submit(None, "rename_test", test_id, new_name)
+        self.testRenamed.emit(test_id)
+
+    def delete_test(self, test_id: int):
+        name = self.names.pop(test_id)
+        del self.name_index[name]
+        del self.summaries[test_id]
+        del self.sort_keys[test_id]
+        self.tests.pop(test_id, None)
+        self.order.remove(test_id)
+
+        self.writer.submit(None, "delete_test", test_id)
+        self.aggregates.remove(test_id)
+        self.save_aggregates()
+        self.testRemoved.emit(test_id)
+
+    # Move the test to idx in the test list,
+    # it gets a sort key between the sort keys of its new neighbours
+    def move_test(self, test_id: int, idx: int):
+        self.order.remove(test_id)
+        self.order.insert(idx, test_id)
+
+        prev_key = self.sort_keys[self.order[idx - 1]] if idx > 0 else None
+        next_key = (
+            self.sort_keys[self.order[idx + 1]] if idx + 1 < len(self.order) else None
+        )
+        if prev_key is None and next_key is None:
+            sort_key = 0
+        elif prev_key is None:
+            sort_key = next_key - 1
+        elif next_key is None:
+            sort_key = prev_key + 1
+        else:
+            sort_key = (prev_key + next_key) / 2
+
+        # No float left between the neighbours, number every test again
+        if sort_key == prev_key or sort_key == next_key:
+            self.renumber()
+        else:
+            self.sort_keys[test_id] = sort_key
+            self.writer.submit(
+                ("sort_key", test_id), "set_sort_key", test_id, sort_key
+            )
+        self.testMoved.emit(test_id)
+
+    # New sort keys 0, 1, 2, ... in the same order
+    def renumber(self):
+        for sort_key, test_id in enumerate(self.order):
+            self.sort_keys[test_id] = sort_key
+        self.writer.submit(("order",), "set_order", self.order.copy())
+
+    # Write every pending change now
+    def flush(self):
+        self.writer.flush()
+        if self.aggregates_writer is not None:
+            self.aggregates_writer.flush()
+
+    def close(self):
+        self.writer.close()
+        if self.aggregates_writer is not None:
+            self.aggregates_writer.close()
+        self.repo.close()
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+import threading
+import time
+import traceback
+
+from .repository import TestRepository
+from ..constants import MAX_WRITE_DELAY, WRITE_DELAY
+
+
+# Writes the changes to the repository in a background thread, so the GUI never waits for the disk.
+# Changes that come in quick succession are written together in one batch,
+# and a change that replaces a pending change with the same key
+# (ex: saving the same note again) drops the older one.
+# A change that fails is undone alone, the rest of the batch is still written.
+# It's kept and tried again before the next batch (or on flush), unless a newer change
+# with the same key replaces it, and on_error is called with the error from the writer thread.
+class BackgroundWriter:
+    def __init__(self, repo: TestRepository, on_error=None):
+        self.repo = repo
+        self.on_error = on_error
+
+        # key -> (method name, args), in the order they have to be written
+        self.pending = OrderedDict()
+        # key -> (method name, args) of the changes that couldn't be written
+        self.failed = OrderedDict()
+        self.condition = threading.Condition()
+        self.first_change = 0
+        self.last_change = 0
+        self.writing = False
+        self.flush_requested = False
+        self.stopping = False
+
+        # Metrics
+        self.changes = 0  # changes submitted
+        self.merged = 0  # changes replaced by a newer change with the same key
+        self.batches = 0  # actual writes to the repository
+        self.failures = 0  # changes that couldn't be written (every try)
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # Queue repo.method(*args), a pending change with the same key is replaced
+    # and moved to the end, so it is still written after everything queued before it.
+    # Changes with None as the key (add, rename, delete) are never replaced
+    def submit(self, key, method: str, *args):
+        with self.condition:
+            if key is None:
+                key = object()
+            elif key in self.pending:
+                del self.pending[key]
+                self.merged += 1
+            self.pending[key] = (method, args)
+            self.changes += 1
+
+            now = time.monotonic()
+            if len(self.pending) == 1:
+                self.first_change = now
+            self.last_change = now
+            self.condition.notify_all()
+
+    # Number of writes saved compared to writing every change on its own
+    def writes_saved(self) -> int:
+        return self.changes - self.batches
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopping:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+
+                # Wait until there are no new changes for WRITE_DELAY
+                while not (self.flush_requested or self.stopping):
+                    deadline = min(
+                        self.last_change + WRITE_DELAY,
+                        self.first_change + MAX_WRITE_DELAY,
+                    )
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+
+                self.retry_failed()
+                changes = list(self.pending.items())
+                self.pending.clear()
+                self.flush_requested = False
+                self.writing = True
+
+            failed, error = self.write(changes)
+
+            with self.condition:
+                for key, change in failed:
+                    if key not in self.pending:
+                        self.failed[key] = change
+                self.failures += len(failed)
+                self.batches += 1
+                self.writing = False
+                self.condition.notify_all()
+
+            if failed and self.on_error is not None:
+                self.on_error(error)
+
+    # Write the changes in one batch,
+    # return the (key, change) that couldn't be written and the last error
+    def write(self, changes: list) -> tuple:
+        failed = []
+        error = None
+        try:
+            with self.repo.batch():
+                for key, (method, args) in changes:
+                    try:
+                        with self.repo.change():
+                            getattr(self.repo, method)(*args)
+                    except Exception as e:
+                        traceback.print_exc()
+                        failed.append((key, (method, args)))
+                        error = e
+        # Nothing of the batch was written
+        except Exception as e:
+            traceback.print_exc()
+            return changes, e
+        return failed, error
+
+    # The changes that failed go back in front of the pending changes,
+    # a failed change that has a newer pending change with the same key is dropped
+    def retry_failed(self):
+        for key, change in reversed(self.failed.items()):
+            if key not in self.pending:
+                self.pending[key] = change
+                self.pending.move_to_end(key, last=False)
+        self.failed.clear()
+
+    # Write everything that is still pending right now and wait for it,
+    # the changes that failed are tried once more
+    def flush(self):
+        with self.condition:
+            self.retry_failed()
+            while self.pending or self.writing:
+                if self.pending:
+                    self.flush_requested = True
+                    self.condition.notify_all()
+                self.condition.wait()
+
+    def close(self):
+        self.flush()
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.thread.join()
@@ -1,31 +1,45 @@
-from math import ceil
+from array import array
 from datetime import datetime
-import os
 
 from PySide6.QtWidgets import (
     QDialog,
-    QGridLayout,
+    QFileDialog,
     QHBoxLayout,
     QLabel,
     QLineEdit,
+    QListView,
     QMessageBox,
-    QScrollArea,
+    QPlainTextEdit,
     QSizePolicy,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionButton,
     QVBoxLayout,
     QWidget,
     QPushButton,
 )
-from PySide6.QtCore import Qt
-import orjson
+from PySide6.QtCore import (
+    QAbstractListModel,
+    QEvent,
+    QModelIndex,
+    QRect,
+    QSize,
+    Qt,
+)
+from PySide6.QtGui import QColor, QCursor, QPainter, QPalette
 
+from .custom_widgets import RapidEntry
 from .finish_slide import FinishSlide
 from ..constants import (
+    BLUE_1,
     BLUE_2,
-    ORJSON_OPTIONS,
     RED_BTN_QSS,
     GREEN_BTN_QSS,
     TIME_FORMAT,
 )
+from ..storage.codec import NO_ANSWER, encode_test
+from ..storage.key_import import parse_answer_keys
+from ..storage.store import DataStore
 
 
 # Answer key view slide
@@ -49,10 +63,24 @@ class AnswerKeySlide(QWidget):
         self.instruction_label.setStyleSheet("font-size: 18px")
         self.buttons.layout().addWidget(self.instruction_label)
 
+        # Question that gets the answer key typed on the keyboard
+        self.current_label = QLabel()
+        self.current_label.setStyleSheet("color: Grey")
+        self.current_label.setToolTip(
+            "Ketik huruf opsi untuk mengisi kunci jawaban, atau nomor soal lalu hurufnya (contoh: 1a2c3e)"
+        )
+        self.buttons.layout().addWidget(self.current_label)
+
         # Spacer
         self.spacer = QWidget()
         self.buttons.layout().addWidget(self.spacer)
 
+        # Import button
+        self.import_button = QPushButton("Impor")
+        self.import_button.setToolTip("Tempel atau buka berkas kunci jawaban")
+        self.import_button.clicked.connect(self.import_answer_keys)
+        self.buttons.layout().addWidget(self.import_button)
+
         # Cancel button
         self.cancel_button = QPushButton("Batalkan")
         self.cancel_button.setStyleSheet(RED_BTN_QSS)
@@ -67,43 +95,83 @@ class AnswerKeySlide(QWidget):
         self.layout().addWidget(self.buttons)
 
         #############################################
-        # Answer Key Scroll Area (scroll horizontally)
+        # Answer Key List (scroll horizontally)
         #############################################
-        self.answer_key_scroll = QScrollArea()
-        self.answer_key_scroll.setSizePolicy(
+        # Only the visible rows are painted (see AnswerKeyDelegate),
+        # they flow top to bottom and wrap into columns like the old grid
+        self.answer_key_model = AnswerKeyModel(
+            self.first_question_num, self.question_counts, self.question_options
+        )
+        self.answer_key_view = QListView()
+        self.answer_key_view.setModel(self.answer_key_model)
+        self.answer_key_view.setItemDelegate(AnswerKeyDelegate(self.answer_key_view))
+        self.answer_key_view.setUniformItemSizes(True)
+        self.answer_key_view.setFlow(QListView.TopToBottom)
+        self.answer_key_view.setWrapping(True)
+        self.answer_key_view.setResizeMode(QListView.Adjust)
+        self.answer_key_view.setSpacing(2)
+        self.answer_key_view.setMouseTracking(True)
+        self.answer_key_view.setSelectionMode(QListView.NoSelection)
+        self.answer_key_view.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        # The keys typed on the keyboard go to this slide
+        self.answer_key_view.setFocusPolicy(Qt.NoFocus)
+        self.answer_key_view.setSizePolicy(
             QSizePolicy.Expanding, QSizePolicy.Expanding
         )
-        self.answer_key_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.layout().addWidget(self.answer_key_scroll)
+        self.layout().addWidget(self.answer_key_view)
+
+        # Keyboard entry, a letter fills the current question and goes to the next one,
+        # so "abcde" fills five questions and "1a2c3e" fills the given numbers
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.current_num = self.first_question_num
+        self.rapid_entry = RapidEntry(
+            self.first_question_num,
+            self.first_question_num + self.question_counts - 1,
+            self.question_options,
+            jump=self.set_current,
+            answer=self.type_answer_key,
+        )
+        self.set_current(self.first_question_num)
+
+    def get_answer_keys(self) -> dict:
+        return self.answer_key_model.get_answer_keys()
+
+    def set_current(self, num: int):
+        self.current_num = num
+        self.current_label.setText(f"Soal {num}")
+        index = self.answer_key_model.index(num - self.first_question_num)
+        self.answer_key_view.setCurrentIndex(index)
+        self.answer_key_view.scrollTo(index)
+
+    def type_answer_key(self, answer_key: str):
+        self.answer_key_model.set_answer_key(
+            self.current_num - self.first_question_num,
+            self.question_options.index(answer_key),
+        )
+        if self.current_num < self.first_question_num + self.question_counts - 1:
+            self.set_current(self.current_num + 1)
+
+    # Answer keys from ImportAnswerKeyDialog, set in one go with a single repaint
+    def import_answer_keys(self):
+        dialog = ImportAnswerKeyDialog(
+            self.question_options,
+            self.first_question_num,
+            self.first_question_num + self.question_counts - 1,
+        )
+        if not dialog.exec():
+            return
 
-        self.answer_key_container = QWidget()
-        self.answer_key_container.setLayout(QGridLayout())
+        self.answer_key_model.set_answer_keys(dialog.answer_keys)
 
-        # AnswerKeyWidget placement inside the grid
-        # this should be [(0, 0), (1, 0), (2, 0), (3, 0), (4, 0), (0, 1), (1,1), (1,2), ...]
-        positions = [
-            (j, i) for i in range(ceil(self.question_counts / 5)) for j in range(5)
-        ]
-        for pos, num in zip(
-            positions,
-            range(
-                self.first_question_num, self.first_question_num + self.question_counts
-            ),
-        ):
-            button = AnswerKeyWidget(num, self.question_options)
-            self.answer_key_container.layout().addWidget(button, *pos)
-        self.answer_key_scroll.setWidget(self.answer_key_container)
+    def keyPressEvent(self, event):
+        if event.modifiers() & (Qt.ControlModifier | Qt.AltModifier):
+            super().keyPressEvent(event)
+        elif not self.rapid_entry.feed(event.text()):
+            super().keyPressEvent(event)
 
-    def get_answer_keys(self) -> dict:
-        answers = {}
-        for num in range(
-            self.first_question_num, self.first_question_num + self.question_counts
-        ):
-            answer_key = self.answer_key_container.findChild(
-                AnswerKeyWidget, f"answerKey{num}"
-            )
-            answers[num] = answer_key.selected_answer
-        return answers
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.setFocus()
 
     # Return all the necessary test data and stats for saving
     # -Test Name,
@@ -136,29 +204,23 @@ class AnswerKeySlide(QWidget):
         test_result["jawaban_tes"] = question_slide.answers
         test_result["kunci_jawaban"] = self.get_answer_keys()
 
-        test_result["waktu_yang_digunakan"] = {}
-        total_time = question_slide.total_time_counter
-
-        # If time limit was set
-        if test_result["batas_waktu"] == 0:
-            test_result["waktu_yang_digunakan"]["total"] = total_time
-        else:
-            test_result["waktu_yang_digunakan"]["total"] = (
-                test_result["batas_waktu"] - total_time
-            )
-
-        test_result["waktu_yang_digunakan"][
-            "per_soal"
-        ] = question_slide.get_questions_time()
+        # Times are in milliseconds
+        test_result["waktu_yang_digunakan"] = {
+            "total": question_slide.get_total_time(),
+            "per_soal": question_slide.get_questions_time(),
+        }
 
         test_result["tanggal_tes"] = current_time
 
         test_result["catatan_tes"] = ""
 
-        return test_result
+        # Answer changes, revisits, ... are derived from the event log of the session
+        test = encode_test(test_result, time_unit=1)
+        test.update(question_slide.session.log.test_fields(question_slide.question_counts))
+        return test
 
     # Show confirmation messagebox if there are still unanswered questions,
-    # then show TestNameDialog and then write the data to data.json
+    # then show TestNameDialog and then add the test to the store
     def finish_answer_session(self):
         qm = QMessageBox
         answers = self.get_answer_keys()
@@ -173,33 +235,17 @@ class AnswerKeySlide(QWidget):
             if confirmation == qm.No:
                 return
 
-        # this is actually just MainWindow.get_root_abspath()
-        # because the file where MainWindow is defined is located in the root directory
-        # but this file, is inside another directory
-        abspath = self.parent().parent().parent().get_root_abspath()
-        data_path = os.path.join(abspath, "data.json")
-
         current_time = datetime.now().strftime(TIME_FORMAT)
 
         # Run TestNameDialog, stop the function if the user canceled it
-        test_name_dialog = TestNameDialog(
-            data_path=data_path, default_test_name=current_time
-        )
+        test_name_dialog = TestNameDialog(default_test_name=current_time)
         if not test_name_dialog.exec():
             return
 
-        # Read and modify data inside data.json
+        # Add new test data as the first test
         test_result = self.get_test_result(current_time)
-        with open(data_path, "r") as f:
-            data = f.read()
-            data = orjson.loads(data)
-
-        with open(data_path, "wb") as f:
-            # Add new test data as the first key
-            new_data = {}
-            new_data[test_name_dialog.test_name] = test_result
-            new_data = dict(new_data, **data)
-            f.write(orjson.dumps(new_data, option=ORJSON_OPTIONS))
+        DataStore.instance().add_test(test_name_dialog.test_name, test_result)
+        self.parent().widget(2).close_checkpoint(remove=True)
 
         # Go to the next slide
         finish_slide = FinishSlide()
@@ -219,62 +265,249 @@ class AnswerKeySlide(QWidget):
         if confirmation == qm.No:
             return
 
+        self.parent().widget(2).close_checkpoint(remove=True)
         self.parent().slideInIdx(0)
 
 
-class AnswerKeyWidget(QWidget):
-    def __init__(self, question_number: int, question_options):
+# Answer key of every question, one row per question
+class AnswerKeyModel(QAbstractListModel):
+    AnswerKeyRole = Qt.UserRole  # option index, NO_ANSWER if empty
+
+    def __init__(self, first_question_num: int, question_counts: int, question_options):
+        super().__init__()
+        self.first_question_num = first_question_num
+        self.question_options = question_options
+        self.answer_keys = array("B", [NO_ANSWER]) * question_counts
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.answer_keys)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return str(self.first_question_num + index.row())
+        if role == self.AnswerKeyRole:
+            return self.answer_keys[index.row()]
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled
+
+    def set_answer_key(self, row: int, answer_key: int):
+        if self.answer_keys[row] == answer_key:
+            return
+        self.answer_keys[row] = answer_key
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [self.AnswerKeyRole])
+
+    # A click on the selected answer key removes it
+    def click_option(self, row: int, answer_key: int):
+        if self.answer_keys[row] == answer_key:
+            answer_key = NO_ANSWER
+        self.set_answer_key(row, answer_key)
+
+    # number -> option, the whole list is repainted once
+    def set_answer_keys(self, answer_keys: dict):
+        if not answer_keys:
+            return
+        for num, option in answer_keys.items():
+            self.answer_keys[num - self.first_question_num] = self.question_options.index(
+                option
+            )
+        self.dataChanged.emit(
+            self.index(0), self.index(len(self.answer_keys) - 1), [self.AnswerKeyRole]
+        )
+
+    # number -> option, "" if empty
+    def get_answer_keys(self) -> dict:
+        return {
+            self.first_question_num + row: ""
+            if answer_key == NO_ANSWER
+            else self.question_options[answer_key]
+            for row, answer_key in enumerate(self.answer_keys)
+        }
+
+
+# Paints a row of AnswerKeyModel like the old answer key widgets,
+# the question number and a button for every option
+class AnswerKeyDelegate(QStyledItemDelegate):
+    NUMBER_WIDTH = 36
+    BUTTON_SIZE = 34
+    SPACING = 6
+    MARGIN = 4
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+
+    def sizeHint(self, option, index):
+        options_count = len(index.model().question_options)
+        return QSize(
+            self.MARGIN * 2
+            + self.NUMBER_WIDTH
+            + options_count * (self.BUTTON_SIZE + self.SPACING),
+            self.BUTTON_SIZE + self.MARGIN * 2,
+        )
+
+    # Rect of the question number and the rects of the option buttons
+    def cell_rects(self, rect: QRect, options_count: int) -> tuple:
+        left = rect.left() + self.MARGIN
+        top = rect.top() + (rect.height() - self.BUTTON_SIZE) // 2
+        number_rect = QRect(left, top, self.NUMBER_WIDTH, self.BUTTON_SIZE)
+        left += self.NUMBER_WIDTH + self.SPACING
+        option_rects = [
+            QRect(
+                left + i * (self.BUTTON_SIZE + self.SPACING),
+                top,
+                self.BUTTON_SIZE,
+                self.BUTTON_SIZE,
+            )
+            for i in range(options_count)
+        ]
+        return number_rect, option_rects
+
+    def paint(self, painter, option, index):
+        widget = option.widget
+        style = widget.style()
+        options = index.model().question_options
+        answer_key = index.data(AnswerKeyModel.AnswerKeyRole)
+        number_rect, option_rects = self.cell_rects(option.rect, len(options))
+        hovered = option.state & QStyle.State_MouseOver
+        mouse_pos = widget.viewport().mapFromGlobal(QCursor.pos())
+
+        painter.save()
+        # The question that gets the answer key typed on the keyboard
+        if index == self.view.currentIndex():
+            painter.fillRect(number_rect, QColor(BLUE_1))
+            painter.setPen(QColor("white"))
+        else:
+            painter.setPen(option.palette.color(QPalette.WindowText))
+        painter.drawText(number_rect, Qt.AlignCenter, index.data(Qt.DisplayRole))
+
+        for option_idx, (rect, text) in enumerate(zip(option_rects, options)):
+            # Same colors as a checked option button (see APP_QSS)
+            if option_idx == answer_key:
+                painter.setRenderHint(QPainter.Antialiasing)
+                painter.setPen(Qt.NoPen)
+                painter.setBrush(QColor(BLUE_2))
+                painter.drawRoundedRect(rect, 4, 4)
+                painter.setPen(QColor("white"))
+                painter.drawText(rect, Qt.AlignCenter, text)
+                continue
+            button = QStyleOptionButton()
+            button.rect = rect
+            button.text = text
+            button.state = QStyle.State_Enabled
+            if hovered and rect.contains(mouse_pos):
+                button.state |= QStyle.State_MouseOver
+            style.drawControl(QStyle.CE_PushButton, button, painter, widget)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            _, option_rects = self.cell_rects(option.rect, len(model.question_options))
+            pos = event.position().toPoint()
+            for option_idx, rect in enumerate(option_rects):
+                if rect.contains(pos):
+                    model.click_option(index.row(), option_idx)
+                    return True
+        return super().editorEvent(event, model, option, index)
+
+
+# Paste the answer keys or open a TXT / CSV file (see key_import.py),
+# the keys are in answer_keys once the dialog is accepted
+class ImportAnswerKeyDialog(QDialog):
+    MAX_ERRORS_SHOWN = 10
+
+    def __init__(self, question_options, first_num: int, last_num: int) -> None:
         super().__init__()
         self.question_options = question_options
-        self.question_number = question_number
-        self.highlight_style = f"background: {BLUE_2};color: white;"
-
-        self.setLayout(QHBoxLayout())
-        self.setObjectName(f"answerKey{self.question_number}")
-
-        # Inner state
-        self.selected_answer = ""
-
-        # Init UI
-        self.question_label = QLabel(str(self.question_number))
-        self.layout().addWidget(self.question_label)
-
-        for option in self.question_options:
-            button = QPushButton(option)
-            button.setObjectName(f"option{option}")
-            button.setFixedSize(34, 34)
-            button.clicked.connect(self.change_answer)
-            self.layout().addWidget(button)
-
-    def change_answer(self):
-        selected_option = self.sender().text()
-
-        # Uncheck answer if the user click the selected answer again
-        if self.selected_answer == selected_option:
-            prev_answer = self.findChild(QPushButton, f"option{self.selected_answer}")
-            new_prev_style = prev_answer.styleSheet().replace(self.highlight_style, "")
-            prev_answer.setStyleSheet(new_prev_style)
-            self.selected_answer = ""
+        self.first_num = first_num
+        self.last_num = last_num
+        self.answer_keys = {}
+
+        self.setWindowTitle("Impor kunci jawaban")
+        self.setLayout(QVBoxLayout())
+        self.setMinimumSize(360, 320)
+
+        self.layout().addWidget(
+            QLabel(
+                "Tempel kunci jawaban, berurutan (ABCDE...) atau bernomor (1. A),\n"
+                "gunakan - untuk soal yang dilewati."
+            )
+        )
+
+        self.text_input = QPlainTextEdit()
+        self.text_input.setPlaceholderText("ABCDEABCDE\natau\n1. A\n2. C")
+        self.layout().addWidget(self.text_input)
+
+        self.buttons = QWidget()
+        self.layout().addWidget(self.buttons)
+        self.buttons.setLayout(QHBoxLayout())
+
+        self.file_button = QPushButton("Buka berkas")
+        self.file_button.clicked.connect(self.open_file)
+        self.buttons.layout().addWidget(self.file_button)
+
+        self.accept_button = QPushButton("Ok")
+        self.accept_button.clicked.connect(
+            lambda: self.read_answer_keys(self.text_input.toPlainText().splitlines())
+        )
+        self.buttons.layout().addWidget(self.accept_button)
+
+        self.reject_button = QPushButton("Batalkan")
+        self.reject_button.clicked.connect(lambda: self.reject())
+        self.buttons.layout().addWidget(self.reject_button)
+
+    # The file is read line by line, it's never loaded into the text box
+    def open_file(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Buka kunci jawaban", "", "Teks (*.txt *.csv);;Semua berkas (*)"
+        )
+        if not path:
+            return
+        with open(path, encoding="utf-8-sig", errors="replace") as f:
+            self.read_answer_keys(f)
+
+    def read_answer_keys(self, lines):
+        qm = QMessageBox
+        answer_keys, errors = parse_answer_keys(
+            lines, self.question_options, self.first_num, self.last_num
+        )
+
+        if not answer_keys:
+            qm.critical(self, "Impor gagal", "Tidak ada kunci jawaban yang dapat dibaca.")
             return
 
-        # If user has select an option before, remove the previous answer highlight
-        if self.selected_answer != "":
-            prev_answer = self.findChild(QPushButton, f"option{self.selected_answer}")
-            new_prev_style = prev_answer.styleSheet().replace(self.highlight_style, "")
-            prev_answer.setStyleSheet(new_prev_style)
+        # Show the bad lines, the user can still use the rest
+        if errors:
+            shown = "\n".join(
+                f"Baris {line_num}: {line.strip()[:30]} ({reason})"
+                for line_num, line, reason in errors[: self.MAX_ERRORS_SHOWN]
+            )
+            if len(errors) > self.MAX_ERRORS_SHOWN:
+                shown += f"\n... dan {len(errors) - self.MAX_ERRORS_SHOWN} baris lainnya"
+            res = qm.warning(
+                self,
+                "Konfirmasi",
+                f"{len(errors)} baris tidak dapat dibaca:\n\n{shown}\n\n"
+                f"Gunakan {len(answer_keys)} kunci jawaban yang dapat dibaca?",
+                qm.Yes | qm.No,
+            )
+            if res == qm.No:
+                return
 
-        # highlight current answer
-        current_answer = self.findChild(QPushButton, f"option{selected_option}")
-        current_answer.setStyleSheet(current_answer.styleSheet() + self.highlight_style)
-        self.selected_answer = selected_option
+        self.answer_keys = answer_keys
+        self.accept()
 
 
 class TestNameDialog(QDialog):
-    def __init__(
-        self, data_path: str, default_test_name: str, prev_test_name: str = None
-    ) -> None:
+    def __init__(self, default_test_name: str, prev_test_name: str = None) -> None:
         super().__init__()
-        self.data_path = data_path
+        self.store = DataStore.instance()
         self.test_name = default_test_name
 
         self.setWindowTitle("Konfirmasi")
@@ -333,10 +566,6 @@ class TestNameDialog(QDialog):
                 "Nama tes sudah dipakai sebelumnya, mohon gunakan nama lain.",
             )
 
-    # Check if test_name is already a name in data.json, if it is, return False
+    # Check if test_name is already a name in the store, if it is, return False
     def check_name_valid(self, test_name) -> bool:
-        with open(self.data_path, "r") as f:
-            data = f.read()
-        data = orjson.loads(data)
-
-        return not test_name in data.keys()
+        return not self.store.has_name(test_name)
@@ -1,7 +1,64 @@
 from PySide6 import QtWidgets, QtCore
 
+
+# Flip a dynamic property matched by APP_QSS (constants.py),
+# only this widget is polished again, and only if the value really changed
+def set_state(widget: QtWidgets.QWidget, name: str, value: bool):
+    if bool(widget.property(name)) == value:
+        return
+    widget.setProperty(name, value)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
+
+
+# Answer option button, checked when it is the chosen option (see APP_QSS)
+def make_option_button(option: str, button_class=QtWidgets.QPushButton):
+    button = button_class(option)
+    button.setProperty("option", True)
+    button.setCheckable(True)
+    button.setFocusPolicy(QtCore.Qt.NoFocus)
+    return button
+
+
+# Answers typed on the keyboard, a stream like "1a2c3e" is read one key at a time:
+# digits jump to that question number right away ("12" goes to 1 and then 12),
+# an option letter answers the current question and ends the number.
+# jump(num) and answer(option) are called back, nothing else is done per key.
+class RapidEntry:
+    def __init__(self, first_num: int, last_num: int, options, jump, answer):
+        self.first_num = first_num
+        self.last_num = last_num
+        self.options = {option.lower(): option for option in options}
+        self.jump = jump
+        self.answer = answer
+        self.number = ""
+
+    # text of a key press, return False if the key is not for the entry
+    def feed(self, text: str) -> bool:
+        if len(text) == 1 and "0" <= text <= "9":
+            # A number that can't be a question starts again from this digit
+            number = self.number + text
+            if not self.first_num <= int(number) <= self.last_num:
+                number = text
+            self.number = number
+            if self.first_num <= int(number) <= self.last_num:
+                self.jump(int(number))
+            return True
+
+        self.number = ""
+        option = self.options.get(text.lower())
+        if option is None:
+            return False
+        self.answer(option)
+        return True
+
+
 # From
 # https://stackoverflow.com/a/52597972/17523708
+# changed so a new slide never waits for the previous one:
+# the slide that is still going on jumps to its end first,
+# and the same animation group is used for every slide.
+# In instant mode the widget is shown right away without animation.
 class SlidingStackedWidget(QtWidgets.QStackedWidget):
     def __init__(self, parent=None):
         super(SlidingStackedWidget, self).__init__(parent)
@@ -14,6 +71,17 @@ class SlidingStackedWidget(QtWidgets.QStackedWidget):
         self.m_wrap = False
         self.m_pnow = QtCore.QPoint(0, 0)
         self.m_active = False
+        self.m_instant = False
+
+        # One animation for the widget that slides out, one for the widget that slides in
+        self.m_anim_group = QtCore.QParallelAnimationGroup(self)
+        self.m_anims = []
+        for _ in range(2):
+            animation = QtCore.QPropertyAnimation()
+            animation.setPropertyName(b"pos")
+            self.m_anim_group.addAnimation(animation)
+            self.m_anims.append(animation)
+        self.m_anim_group.finished.connect(self.animationDoneSlot)
 
     def setDirection(self, direction):
         self.m_direction = direction
@@ -27,6 +95,9 @@ class SlidingStackedWidget(QtWidgets.QStackedWidget):
     def setWrap(self, wrap):
         self.m_wrap = wrap
 
+    def setInstant(self, instant):
+        self.m_instant = instant
+
     @QtCore.Slot()
     def slideInPrev(self):
         now = self.currentIndex()
@@ -46,17 +117,22 @@ class SlidingStackedWidget(QtWidgets.QStackedWidget):
             idx = (idx + self.count()) % self.count()
         self.slideInWgt(self.widget(idx))
 
-    def slideInWgt(self, newwidget):
+    # Jump to the end of the slide that is going on, if there is one
+    def finishSlide(self):
         if self.m_active:
-            return
+            self.m_anim_group.setCurrentTime(self.m_anim_group.totalDuration())
 
-        self.m_active = True
+    def slideInWgt(self, newwidget):
+        self.finishSlide()
 
         _now = self.currentIndex()
         _next = self.indexOf(newwidget)
 
         if _now == _next:
-            self.m_active = False
+            return
+
+        if self.m_instant:
+            self.setCurrentIndex(_next)
             return
 
         offsetx, offsety = self.frameRect().width(), self.frameRect().height()
@@ -82,27 +158,19 @@ class SlidingStackedWidget(QtWidgets.QStackedWidget):
         self.widget(_next).show()
         self.widget(_next).raise_()
 
-        anim_group = QtCore.QParallelAnimationGroup(
-            self, finished=self.animationDoneSlot
-        )
-
-        for index, start, end in zip(
-            (_now, _next), (pnow, pnext - offset), (pnow + offset, pnext)
+        for animation, index, start, end in zip(
+            self.m_anims, (_now, _next), (pnow, pnext - offset), (pnow + offset, pnext)
         ):
-            animation = QtCore.QPropertyAnimation(
-                self.widget(index),
-                b"pos",
-                duration=self.m_speed,
-                easingCurve=self.m_animationtype,
-                startValue=start,
-                endValue=end,
-            )
-            anim_group.addAnimation(animation)
+            animation.setTargetObject(self.widget(index))
+            animation.setDuration(self.m_speed)
+            animation.setEasingCurve(self.m_animationtype)
+            animation.setStartValue(start)
+            animation.setEndValue(end)
 
         self.m_next = _next
         self.m_now = _now
         self.m_active = True
-        anim_group.start(QtCore.QAbstractAnimation.DeleteWhenStopped)
+        self.m_anim_group.start()
 
     @QtCore.Slot()
     def animationDoneSlot(self):
@@ -21,7 +21,6 @@ class FinishSlide(QWidget):
         back_button.setStyleSheet("font-size: 14px")
         container.layout().addWidget(back_button)
 
-    # update test list and then slide back to home slide
+    # slide back to home slide, the test list already has the new test
     def back_to_home(self):
-        self.parent().parent().parent().review_test.update_test_list()
         self.parent().slideInIdx(0)
@@ -0,0 +1,163 @@
+from math import isnan
+
+from PySide6.QtCore import QTimer, Qt, Signal
+from PySide6.QtWidgets import (
+    QFormLayout,
+    QLabel,
+    QScrollArea,
+    QVBoxLayout,
+    QWidget,
+)
+
+from ..storage.store import DataStore
+
+
+# Statistics of every saved test (see storage/analytics.py).
+# Every test is read to build them, so they are only built while this window is open,
+# in a background thread (see DataStore.load_history), and built again a moment after
+# the tests change. Only one is built at a time, a change while it's building
+# builds them once more after it
+class HistoryWindow(QWidget):
+    # Tests shown in the accuracy trend, newest first
+    TREND_TESTS = 10
+    ROLLING_WINDOW = 5
+    # Question positions shown as the hardest ones
+    HARDEST_POSITIONS = 5
+    REFRESH_DELAY = 1000  # milliseconds
+
+    # Signals
+    windowClosed = Signal(QWidget)
+
+    def __init__(self):
+        super().__init__()
+        self.store = DataStore.instance()
+
+        self.setFixedSize(500, 550)
+        self.setWindowTitle("Statistik semua tes")
+        self.setLayout(QVBoxLayout())
+        self.left_colon = ":    "
+
+        title = QLabel("Statistik semua tes")
+        title.setStyleSheet("font-size: 22px")
+        self.layout().addWidget(title)
+
+        self.scroll = QScrollArea()
+        self.scroll.setWidgetResizable(True)
+        self.scroll.setStyleSheet("QScrollArea {border:none}")
+        self.layout().addWidget(self.scroll)
+
+        # Changes that come in quick succession (ex: answer keys) build them once
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(self.REFRESH_DELAY)
+        self.refresh_timer.timeout.connect(self.load_stats)
+        self.store.aggregatesChanged.connect(self.refresh_timer.start)
+        self.store.historyLoaded.connect(self.update_stats)
+
+        self.loading = False
+        self.reload_pending = False
+        self.scroll.setWidget(QLabel("Memuat..."))
+        self.load_stats()
+
+    def closeEvent(self, event):
+        self.store.aggregatesChanged.disconnect(self.refresh_timer.start)
+        self.store.historyLoaded.disconnect(self.update_stats)
+        self.windowClosed.emit(self)
+        # Quit
+        event.accept()
+
+    def load_stats(self):
+        if self.loading:
+            self.reload_pending = True
+            return
+        self.loading = True
+        self.store.load_history()
+
+    def update_stats(self, history):
+        self.loading = False
+        if self.reload_pending:
+            self.reload_pending = False
+            self.load_stats()
+
+        content = QWidget()
+        content.setLayout(QVBoxLayout())
+        content.layout().setAlignment(Qt.AlignTop)
+        content.setStyleSheet("font-size: 14px;")
+
+        if not history.test_ids:
+            content.layout().addWidget(QLabel("Belum ada tes yang tersimpan"))
+        else:
+            self.add_accuracy_trend(content, history)
+            self.add_time_vs_correctness(content, history)
+            self.add_option_bias(content, history)
+            self.add_position_difficulty(content, history)
+
+        self.scroll.setWidget(content)
+
+    # A section title and the form its rows go to
+    def add_section(self, content: QWidget, title: str) -> QFormLayout:
+        label = QLabel(title)
+        label.setStyleSheet("font-size: 18px; margin-top: 10px")
+        content.layout().addWidget(label)
+
+        section = QWidget()
+        section.setLayout(QFormLayout())
+        content.layout().addWidget(section)
+        return section.layout()
+
+    def add_accuracy_trend(self, content: QWidget, history):
+        rows = self.add_section(content, "Akurasi tes terakhir")
+        accuracy, rolling = history.accuracy_trend(self.ROLLING_WINDOW)
+        last_tests = range(len(history.test_ids) - 1, -1, -1)[: self.TREND_TESTS]
+        for row in last_tests:
+            tests_date = history.dates[row].strftime("%d/%m/%Y %H:%M")
+            if isnan(accuracy[row]):
+                text = "tidak ada kunci jawaban"
+            else:
+                text = f"{accuracy[row]:.0%}"
+            if not isnan(rolling[row]):
+                text += f" (rata-rata {self.ROLLING_WINDOW} tes: {rolling[row]:.0%})"
+            rows.addRow(QLabel(tests_date), QLabel(f"{self.left_colon}{text}"))
+
+    def add_time_vs_correctness(self, content: QWidget, history):
+        rows = self.add_section(content, "Waktu per soal")
+        edges, counts, rate = history.time_vs_correctness()
+        for idx, count in enumerate(counts):
+            if count == 0:
+                continue
+            if idx == len(counts) - 1:
+                seconds = f"{edges[idx]} detik atau lebih"
+            else:
+                seconds = f"{edges[idx]} - {edges[idx + 1]} detik"
+            rows.addRow(
+                QLabel(seconds),
+                QLabel(f"{self.left_colon}{rate[idx]:.0%} benar dari {count} soal"),
+            )
+
+    def add_option_bias(self, content: QWidget, history):
+        rows = self.add_section(content, "Pilihan jawaban")
+        answer_share, key_share = history.option_bias()
+        for idx, option in enumerate(history.question_options):
+            answer = 0 if isnan(answer_share[idx]) else answer_share[idx]
+            key = 0 if isnan(key_share[idx]) else key_share[idx]
+            rows.addRow(
+                QLabel(option),
+                QLabel(f"{self.left_colon}dipilih {answer:.0%}, kunci jawaban {key:.0%}"),
+            )
+
+    def add_position_difficulty(self, content: QWidget, history):
+        rows = self.add_section(content, "Soal yang paling sering salah")
+        incorrect_rate, tests = history.position_difficulty()
+        # Positions without an answer key are left out, ties go to the earlier position
+        positions = sorted(
+            (position for position, count in enumerate(tests) if count),
+            key=lambda position: -incorrect_rate[position],
+        )
+        for position in positions[: self.HARDEST_POSITIONS]:
+            rows.addRow(
+                QLabel(f"Soal ke-{position + 1}"),
+                QLabel(
+                    f"{self.left_colon}salah {incorrect_rate[position]:.0%}"
+                    f" dari {tests[position]} tes"
+                ),
+            )
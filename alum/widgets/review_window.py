@@ -1,6 +1,13 @@
+from array import array
 from datetime import datetime
 
-from PySide6.QtCore import Qt, Signal, Slot
+from PySide6.QtCore import (
+    QAbstractProxyModel,
+    QAbstractTableModel,
+    QModelIndex,
+    Qt,
+    Signal,
+)
 from PySide6.QtGui import QColor
 from PySide6.QtWidgets import (
     QComboBox,
@@ -11,33 +18,38 @@ from PySide6.QtWidgets import (
     QLabel,
     QPlainTextEdit,
     QPushButton,
-    QTableWidget,
-    QTableWidgetItem,
+    QScrollArea,
+    QSlider,
+    QTableView,
     QVBoxLayout,
     QWidget,
 )
-import orjson
 
 from .custom_widgets import SlidingStackedWidget
 from .answer_slide import TestNameDialog
-from ..constants import DAY_INDO, GREEN_1, GREEN_BTN_QSS, MONTH_INDO, ORJSON_OPTIONS, RED_2, TIME_FORMAT
+from .test_slide import QuestionNavigator, TestSession
+from ..constants import DAY_INDO, GREEN_1, GREEN_BTN_QSS, MONTH_INDO, RED_2, TIME_FORMAT
+from ..storage.codec import NO_ANSWER
+from ..storage.event_log import NO_TIME, LogReplay
+from ..storage.store import DataStore
 
 
 class ReviewTestWindow(QWidget):
     SORT_METHODS = ("number", "accuracy", "time")
+    # Rows measured for the column widths of the table
+    RESIZE_PRECISION = 50
 
     # Signals
-    dataUpdated = Signal()
-    testNameRenamed = Signal(str, str)
     windowClosed = Signal(QWidget)
 
-    def __init__(self, test_name: str, test_data: dict, data_path: str):
+    def __init__(self, test_id: int):
         super().__init__()
-        self.test_name = test_name
-        self.test_data = test_data
-        self.data_path = data_path
+        self.store = DataStore.instance()
+        self.test_id = test_id
+        self.test_name = self.store.get_name(test_id)
+        self.test_data = self.store.get_test(test_id)
 
-        self.setFixedSize(500, 550)
+        self.setFixedSize(580, 550)
         self.setWindowTitle(self.get_title(self.test_name))
         self.setLayout(QVBoxLayout())
 
@@ -68,6 +80,7 @@ class ReviewTestWindow(QWidget):
         #########################################
         self.init_stat_slide()
         self.init_test_review_slide()
+        self.init_replay_slide()
         self.init_test_note_slide()
 
     def closeEvent(self, event):
@@ -148,7 +161,7 @@ class ReviewTestWindow(QWidget):
         )
 
         # Total time used
-        total_time = self.test_data["waktu_yang_digunakan"]["total"]
+        total_time = self.test_data["waktu_total"] // 1000
         total_time = self.format_time(total_time)
         stats_list.layout().addRow(
             QLabel("Waktu yang digunakan"),
@@ -208,35 +221,50 @@ class ReviewTestWindow(QWidget):
         #######################################
         # Table
         #######################################
-        question_counts = self.test_data["jumlah_soal"]
+        # The rows are painted from the test data, the proxy only keeps the order
+        self.table_model = ReviewTableModel(self.test_data, self.format_time)
+        self.table_proxy = ReviewSortProxy()
+        self.table_proxy.setSourceModel(self.table_model)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setRowCount(question_counts)
+        self.table = QTableView()
+        self.table.setModel(self.table_proxy)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.verticalHeader().hide()
 
-        # Set header
-        hor_header = ("No.", "Jawaban terpilih", "Kunci Jawaban", "Waktu")
-        self.table.setHorizontalHeaderLabels(hor_header)
-
-        self.table.itemClicked.connect(self.table_item_clicked)
+        self.table.clicked.connect(self.table_item_clicked)
         # Double click mechanism
-        self.__prev_click = 0
+        self.__prev_click = None
 
-        # Update table
+        # Sort
         self.update_table()
 
-        # Resize column to content so it fits nicely
+        # Resize column to content so it fits nicely,
+        # only some rows are measured (the last column is stretched)
+        self.table.horizontalHeader().setResizeContentsPrecision(self.RESIZE_PRECISION)
         self.table.resizeColumnToContents(0)
         self.table.resizeColumnToContents(1)
         self.table.resizeColumnToContents(2)
         self.table.resizeColumnToContents(3)
+        self.table.resizeColumnToContents(4)
+        self.fit_number_column()
 
         self.test_review_slide.layout().addWidget(self.table)
 
         self.main_slide.addWidget(self.test_review_slide)
 
+    # The widest number is the last one, it might not be in the measured rows
+    def fit_number_column(self):
+        last_idx = self.test_data["jumlah_soal"] - 1
+        last_num_width = self.table.sizeHintForIndex(
+            self.table_proxy.mapFromSource(self.table_model.index(last_idx, 0))
+        ).width()
+        if last_num_width >= self.table.columnWidth(0):
+            self.table.setColumnWidth(0, last_num_width + 1)
+
+    def init_replay_slide(self):
+        self.replay_slide = ReplayWidget(self.test_data)
+        self.main_slide.addWidget(self.replay_slide)
+
     def init_test_note_slide(self):
         self.test_note_slide = QWidget()
         self.test_note_slide.setLayout(QVBoxLayout())
@@ -278,115 +306,22 @@ class ReviewTestWindow(QWidget):
     def get_questions_range(self, first_num, counts):
         return f"{first_num} - {first_num+counts-1}"
 
-    # sort_method should be "correctness", "time", "number"(default)
-    def get_sorted_result(
-        self, sort_method: str = "number", ascending: bool = True
-    ) -> list:
-        if sort_method not in self.SORT_METHODS:
-            return
-
-        first_num = self.test_data["nomor_pertama"]
-        question_counts = self.test_data["jumlah_soal"]
-
-        # Data
-        numbers = [str(i) for i in range(first_num, first_num + question_counts)]
-        data = []
-        user_answers = list(self.test_data["jawaban_tes"].values())
-        answer_key = list(self.test_data["kunci_jawaban"].values())
-        time_spent = list(self.test_data["waktu_yang_digunakan"]["per_soal"].values())
-
-        # Add data to data variable
-        # if the user didn't answer the question or answer key, then set it to "tidak ada"
-        for (idx, val) in enumerate(numbers):
-            ua = user_answers[idx] if user_answers[idx] != "" else "tidak ada"
-            ak = answer_key[idx] if answer_key[idx] != "" else "tidak ada"
-            row = (val, ua, ak, time_spent[idx])
-            data.append(row)
-
-        # Sort the list based on sort_method
-        if sort_method == "number":
-            data.sort(key=lambda x: int(x[0]))
-        elif sort_method == "accuracy":
-
-            # Compare user answers and the answer key
-            def sort_tf(x1, x2):
-                # no answer
-                if x2 == "tidak ada":
-                    return 3
-                # false
-                elif x1 != x2:
-                    return 2
-                # true
-                else:
-                    return 1
-
-            data.sort(key=lambda x: sort_tf(x[1], x[2]))
-        else:
-            data.sort(key=lambda x: int(x[3]))
-
-        # Ascending or descending
-        if ascending == False:
-            data = reversed(data)
-
-        return data
-
-    # Update correct, incorrect, and undetermined counts
+    # Update correct, incorrect, and undetermined counts, they are kept in the summary
     def update_ciu_counts(self):
-        test_and_key = zip(
-            self.test_data["jawaban_tes"].values(),
-            self.test_data["kunci_jawaban"].values(),
-        )
-        correct_count = 0
-        incorrect_count = 0
-        undetermined_count = 0
-        for test, key in test_and_key:
-            if test == "":
-                incorrect_count += 1
-            elif key == "":
-                undetermined_count += 1
-            elif test != key:
-                incorrect_count += 1
-            else:
-                correct_count += 1
+        summary = self.store.get_summary(self.test_id)
+        correct_count = summary["benar"]
+        incorrect_count = summary["salah"]
+        undetermined_count = summary["tidak_tentu"]
 
         self.correct_counts_label.setText(f"{self.left_colon}{correct_count} soal")
         self.incorrect_counts_label.setText(f"{self.left_colon}{incorrect_count} soal")
         self.undetermined_count_label.setText(f"{self.left_colon}{undetermined_count} soal")
 
-    # Called everytime there is an update on the data
+    # Called when the sort method changes, the rows are only put in another order
     def update_table(self):
         sort_method = self.SORT_METHODS[self.sort_method.currentIndex()]
         ascending = self.asc_or_desc.currentIndex() == 0
-
-        data = self.get_sorted_result(sort_method, ascending)
-
-        for (row, row_value) in enumerate(data):
-            test_answer = row_value[1]
-            answer_key = row_value[2]
-
-            # Highlight, correct = green, incorrect = red, undetermined = black
-            # if the test answer is nothing, then it's incorrect
-            # if the answer key is nothing, then it's undetermined,
-            # if the test answer is not the same as the answer key, it's incorrect
-            # else it is correct
-            if test_answer == "tidak ada":
-                bg = RED_2
-            elif answer_key == "tidak ada":
-                bg = ""
-            elif test_answer != answer_key:
-                bg = RED_2
-            else:
-                bg = GREEN_1
-
-            for (idx, value) in enumerate(row_value):
-                # Format time, time is always the last in row_value
-                if idx == len(row_value) - 1:
-                    value = self.format_time(value)
-
-                item = QTableWidgetItem(str(value))
-                item.setBackground(QColor(bg))
-                item.setFlags(item.flags() ^ Qt.ItemIsEditable)
-                self.table.setItem(row, idx, item)
+        self.table_proxy.sort_rows(sort_method, ascending)
 
     def format_time(self, time) -> str:
         time = int(time)
@@ -404,52 +339,38 @@ class ReviewTestWindow(QWidget):
 
     # When rename test clicked
     def rename_test(self):
-        dialog = TestNameDialog(
-            self.data_path, self.test_data["tanggal_tes"], self.test_name
-        )
+        dialog = TestNameDialog(self.test_data["tanggal_tes"], self.test_name)
 
-        # Update in file
+        # Update in store
         if not dialog.exec():
             return
         new_name = dialog.test_name
 
-        with open(self.data_path, "r") as f:
-            data = orjson.loads(f.read())
-
-        # rename self.test_name key to new_name
-        new_keys = list(data.keys())
-        new_keys = [x.replace(self.test_name, new_name) for x in new_keys]
-        values = list(data.values())
-        new_data = {new_keys[i]: values[i] for i in range(len(values))}
-
-        with open(self.data_path, "wb") as f:
-            f.write(orjson.dumps(new_data, option=ORJSON_OPTIONS))
+        self.store.rename_test(self.test_id, new_name)
 
         # Update Review windows
         self.title_test_name.setText(self.get_title(new_name))
         self.setWindowTitle(self.get_title(new_name))
 
-        # Update test list
-        self.testNameRenamed.emit(self.test_name, new_name)
         self.test_name = new_name
 
-    @Slot(QTableWidgetItem)
-    def table_item_clicked(self, it: QTableWidgetItem):
-        question_num = int(self.table.item(it.row(), 0).text())
+    def table_item_clicked(self, index: QModelIndex):
+        idx = self.table_proxy.mapToSource(index).row()
 
         options = self.test_data["opsi_soal"].copy()
         options.append("tidak ada")
 
         # Double click mechanism
-        if it.column() == 2:
-            current_idx = options.index(it.text())
-            if question_num == self.__prev_click:
-                self.change_answer_key(str(question_num), current_idx, options)
-                self.__prev_click = 0
+        if index.column() == ReviewTableModel.KEY_COLUMN:
+            answer_key = self.test_data["kunci"][idx]
+            current_idx = len(options) - 1 if answer_key == NO_ANSWER else answer_key
+            if idx == self.__prev_click:
+                self.change_answer_key(idx, current_idx, options)
+                self.__prev_click = None
             else:
-                self.__prev_click = question_num
+                self.__prev_click = idx
         else:
-            self.__prev_click = 0
+            self.__prev_click = None
 
     def change_first_num(self, _):
         first_num = self.test_data["nomor_pertama"]
@@ -463,24 +384,8 @@ class ReviewTestWindow(QWidget):
         if new_first_num == first_num:
             return
 
-        new_nums = [str(i + new_first_num) for i in range(question_counts)]
-        old_nums = self.test_data["kunci_jawaban"].keys()
-        nums = zip(old_nums, new_nums)
-
-        # Change questions in test questions, answer key, and time spend
-        answer_key = self.test_data["kunci_jawaban"].copy()
-        test_answer = self.test_data["jawaban_tes"].copy()
-        time_spent = self.test_data["waktu_yang_digunakan"]["per_soal"].copy()
-        for old, new in nums:
-            answer_key[new] = answer_key.pop(old)
-            test_answer[new] = test_answer.pop(old)
-            time_spent[new] = time_spent.pop(old)
-        self.test_data["kunci_jawaban"] = answer_key
-        self.test_data["jawaban_tes"] = test_answer
-        self.test_data["waktu_yang_digunakan"]["per_soal"] = time_spent
-
-        # Update first num
-        self.test_data["nomor_pertama"] = new_first_num
+        # The questions are kept by their position, so only the first num changes
+        self.store.set_first_num(self.test_id, new_first_num)
 
         # update range text
         self.range_text.setText(
@@ -488,48 +393,359 @@ class ReviewTestWindow(QWidget):
             self.get_questions_range(new_first_num, question_counts)
         )
 
-        # update table
-        for idx in range(question_counts):
-            self.table.item(idx, 0).setText(str(new_nums[idx]))
-
-        self.write_data()
+        # update table and replay, the numbers are counted from the first num
+        self.__prev_click = None
+        self.table_model.update_numbers()
+        self.fit_number_column()
+        self.replay_slide.update_first_num()
 
-    def change_answer_key(self, question_num, current_idx, options):
+    # idx is the position of the question
+    def change_answer_key(self, idx, current_idx, options):
         dialog = ChangeAnswerDialog(options, current_idx)
 
         # Canceled
         if not dialog.exec():
             return
 
-        # Change the last option from "tidak ada" to ""
-        options.pop()
-        options.append("")
-
-        idx = dialog.combo_box.currentIndex()
-        self.test_data["kunci_jawaban"][question_num] = options[idx]
-        self.update_table()
-
-        self.write_data()
+        # The last option is "tidak ada"
+        answer_key = dialog.combo_box.currentIndex()
+        if answer_key == len(options) - 1:
+            answer_key = NO_ANSWER
+        self.store.set_answer_key(self.test_id, idx, answer_key)
+        self.table_model.update_answer_key(idx)
 
         self.update_ciu_counts()
 
     def save_test_note(self):
-        self.test_data["catatan_tes"] = self.test_note.toPlainText()
+        self.store.set_note(self.test_id, self.test_note.toPlainText())
+
+
+# Every question of a test, read from the arrays of the test data,
+# so a change of the test data only needs dataChanged for what changed
+class ReviewTableModel(QAbstractTableModel):
+    HEADERS = ("No.", "Jawaban terpilih", "Kunci Jawaban", "Waktu", "Diubah", "Dibuka ulang")
+    NUMBER_COLUMN = 0
+    ANSWER_COLUMN = 1
+    KEY_COLUMN = 2
+    TIME_COLUMN = 3
+    # From the event log (see event_log.log_metrics), "-" for a test saved without it
+    CHANGES_COLUMN = 4
+    REVISITS_COLUMN = 5
+
+    def __init__(self, test_data: dict, format_time):
+        super().__init__()
+        self.test_data = test_data
+        self.format_time = format_time
+        # if the user didn't answer the question or answer key, then it's "tidak ada"
+        self.option_texts = {NO_ANSWER: "tidak ada"}
+        self.option_texts.update(enumerate(test_data["opsi_soal"]))
+        self.correct_color = QColor(GREEN_1)
+        self.incorrect_color = QColor(RED_2)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.test_data["jumlah_soal"]
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        idx = index.row()
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == self.NUMBER_COLUMN:
+                return str(self.test_data["nomor_pertama"] + idx)
+            if column == self.ANSWER_COLUMN:
+                return self.option_texts[self.test_data["jawaban"][idx]]
+            if column == self.KEY_COLUMN:
+                return self.option_texts[self.test_data["kunci"][idx]]
+            if column == self.TIME_COLUMN:
+                return self.format_time(self.test_data["waktu"][idx] // 1000)
+            if column == self.CHANGES_COLUMN:
+                return self.metric_text("perubahan", idx)
+            return self.metric_text("kunjungan_ulang", idx)
+
+        # When the question was first answered
+        if role == Qt.ToolTipRole and column == self.TIME_COLUMN:
+            first_answer = self.test_data["waktu_jawab"]
+            if not first_answer:
+                return None
+            if first_answer[idx] == NO_TIME:
+                return "Tidak dijawab"
+            time = self.format_time(first_answer[idx] // 1000)
+            return f"Dijawab pertama kali {time} setelah tes dimulai"
+
+        # Highlight, correct = green, incorrect = red, undetermined = no color
+        if role == Qt.BackgroundRole:
+            answer = self.test_data["jawaban"][idx]
+            answer_key = self.test_data["kunci"][idx]
+            if answer == NO_ANSWER:
+                return self.incorrect_color
+            if answer_key == NO_ANSWER:
+                return None
+            if answer != answer_key:
+                return self.incorrect_color
+            return self.correct_color
+        return None
+
+    def metric_text(self, metric: str, idx: int) -> str:
+        values = self.test_data[metric]
+        return str(values[idx]) if values else "-"
+
+    # Source rows in the order of sort_method ("number", "accuracy", "time"),
+    # a stable sort, so the rows of the same value stay in number order
+    def sorted_rows(self, sort_method: str) -> array:
+        rows = range(self.test_data["jumlah_soal"])
+        if sort_method == "number":
+            return array("I", rows)
 
-        self.write_data()
+        if sort_method == "accuracy":
+            answers = self.test_data["jawaban"]
+            answer_keys = self.test_data["kunci"]
 
-    def write_data(self):
-        """ Write self.test_data to data_path """
-        # Update data
-        with open(self.data_path, "r") as f:
-            data = orjson.loads(f.read())
+            # true, then false, then no answer key
+            def sort_key(idx):
+                if answer_keys[idx] == NO_ANSWER:
+                    return 3
+                if answers[idx] != answer_keys[idx]:
+                    return 2
+                return 1
+
+        else:
+            sort_key = self.test_data["waktu"].__getitem__
+        return array("I", sorted(rows, key=sort_key))
+
+    # The answer key of the question idx was changed in the test data
+    def update_answer_key(self, idx: int):
+        self.dataChanged.emit(
+            self.index(idx, self.KEY_COLUMN),
+            self.index(idx, self.KEY_COLUMN),
+            [Qt.DisplayRole],
+        )
+        # The color of the whole row
+        self.dataChanged.emit(
+            self.index(idx, 0),
+            self.index(idx, len(self.HEADERS) - 1),
+            [Qt.BackgroundRole],
+        )
+
+    # The first number was changed in the test data
+    def update_numbers(self):
+        self.dataChanged.emit(
+            self.index(0, self.NUMBER_COLUMN),
+            self.index(self.rowCount() - 1, self.NUMBER_COLUMN),
+            [Qt.DisplayRole],
+        )
+
+
+# The rows of ReviewTableModel in the chosen order.
+# The order of every sort method is computed once and cached,
+# a change in the source only drops the orders that depend on the changed columns.
+class ReviewSortProxy(QAbstractProxyModel):
+    SORT_COLUMNS = {
+        "number": (ReviewTableModel.NUMBER_COLUMN,),
+        "accuracy": (ReviewTableModel.ANSWER_COLUMN, ReviewTableModel.KEY_COLUMN),
+        "time": (ReviewTableModel.TIME_COLUMN,),
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.sort_method = "number"
+        self.ascending = True
+        self.permutations = {}  # sort method -> source rows in ascending order
+        self.order = array("I")  # proxy row -> source row
+        self.positions = array("I")  # source row -> proxy row
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.dataChanged.connect(self.source_data_changed)
+        self.permutations.clear()
+        self.beginResetModel()
+        self.update_order()
+        self.endResetModel()
+
+    def update_order(self):
+        if self.sort_method not in self.permutations:
+            self.permutations[self.sort_method] = self.sourceModel().sorted_rows(
+                self.sort_method
+            )
+        order = self.permutations[self.sort_method]
+        # Descending is the ascending order reversed
+        self.order = order if self.ascending else order[::-1]
+        self.positions = array("I", bytes(4 * len(self.order)))
+        for row, source_row in enumerate(self.order):
+            self.positions[source_row] = row
+
+    # Put the rows in another order, the persistent indexes (selection, current)
+    # follow their source rows
+    def sort_rows(self, sort_method: str, ascending: bool = True):
+        self.layoutAboutToBeChanged.emit()
+        old_persistent = self.persistentIndexList()
+        source_indexes = [self.mapToSource(index) for index in old_persistent]
+
+        self.sort_method = sort_method
+        self.ascending = ascending
+        self.update_order()
+
+        self.changePersistentIndexList(
+            old_persistent, [self.mapFromSource(index) for index in source_indexes]
+        )
+        self.layoutChanged.emit()
+
+    def source_data_changed(self, top_left, bottom_right, roles):
+        # Changed rows are mapped one by one, they aren't next to each other here
+        for source_row in range(top_left.row(), bottom_right.row() + 1):
+            row = self.positions[source_row]
+            self.dataChanged.emit(
+                self.index(row, top_left.column()),
+                self.index(row, bottom_right.column()),
+                roles,
+            )
+
+        if roles and Qt.DisplayRole not in roles:
+            return
+        columns = range(top_left.column(), bottom_right.column() + 1)
+        for sort_method, sort_columns in self.SORT_COLUMNS.items():
+            if any(column in columns for column in sort_columns):
+                self.permutations.pop(sort_method, None)
+        # The rows of the current order may have moved
+        if self.sort_method not in self.permutations:
+            self.sort_rows(self.sort_method, self.ascending)
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(
+            self.order[proxy_index.row()], proxy_index.column()
+        )
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        return self.index(self.positions[source_index.row()], source_index.column())
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return self.sourceModel().columnCount()
 
-        data[self.test_name] = self.test_data
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        return self.sourceModel().headerData(section, orientation, role)
 
-        with open(self.data_path, "wb") as f:
-            f.write(orjson.dumps(data, option=ORJSON_OPTIONS))
 
-        self.dataUpdated.emit()
+# Replay of the test session from its event log (see event_log.py),
+# the slider goes through the whole session and the navigator shows
+# which question was open and what was answered at that moment
+class ReplayWidget(QWidget):
+    def __init__(self, test_data: dict):
+        super().__init__()
+        self.test_data = test_data
+        self.setLayout(QVBoxLayout())
+
+        title = QLabel("Putar ulang tes")
+        title.setStyleSheet("font-size: 22px")
+        self.layout().addWidget(title)
+
+        # Tests saved before the event log can't be replayed
+        if not test_data["log_kejadian"]:
+            info = QLabel("Tes ini disimpan sebelum adanya fitur putar ulang.")
+            info.setWordWrap(True)
+            self.layout().addWidget(info, alignment=Qt.AlignTop)
+            return
+
+        self.replay = LogReplay(
+            test_data["log_kejadian"], test_data["log_waktu"], test_data["jumlah_soal"]
+        )
+
+        #################################
+        # Time and status
+        #################################
+        status = QWidget()
+        status.setLayout(QHBoxLayout())
+        self.time_label = QLabel()
+        self.status_label = QLabel()
+        status.layout().addWidget(self.time_label)
+        status.layout().addWidget(self.status_label, alignment=Qt.AlignRight)
+        self.layout().addWidget(status)
+
+        self.slider = QSlider(Qt.Horizontal)
+        self.slider.setRange(0, self.replay.duration())
+        self.slider.setSingleStep(1000)
+        self.slider.setPageStep(60_000)
+        self.slider.valueChanged.connect(self.seek)
+        self.layout().addWidget(self.slider)
+
+        #################################
+        # Questions
+        #################################
+        self.navigator_scroll = QScrollArea()
+        self.navigator_scroll.setAlignment(Qt.AlignHCenter)
+        self.layout().addWidget(self.navigator_scroll)
+        self.update_first_num()
+
+    # The navigator is built again for the numbers from nomor_pertama
+    def update_first_num(self):
+        if not self.test_data["log_kejadian"]:
+            return
+        self.session = TestSession(
+            self.test_data["nomor_pertama"],
+            self.test_data["jumlah_soal"],
+            self.test_data["opsi_soal"],
+        )
+        self.navigator = QuestionNavigator(self.session)
+        self.navigator.setFocusPolicy(Qt.NoFocus)
+        self.navigator_scroll.setWidget(self.navigator)
+        self.seek(self.slider.value())
+
+    # Show the state of the session at time (milliseconds since the start)
+    def seek(self, time: int):
+        state = self.replay.state_at(time)
+        first_num = self.session.first_question_num
+        options = self.test_data["opsi_soal"]
+
+        for idx, answer in enumerate(state.answers):
+            self.session.answers[first_num + idx] = (
+                "" if answer == NO_ANSWER else options[answer]
+            )
+        self.session.doubts = {
+            first_num + idx for idx, doubt in enumerate(state.doubts) if doubt
+        }
+        self.navigator.current = first_num + state.focused
+        self.navigator.update()
+
+        seconds = time // 1000
+        self.time_label.setText(f"{str(seconds // 60).zfill(2)}:{str(seconds % 60).zfill(2)}")
+        if state.finished:
+            self.status_label.setText("Selesai")
+        elif state.paused:
+            self.status_label.setText("Dijeda")
+        else:
+            self.status_label.setText(f"Soal {first_num + state.focused} dibuka")
 
 
 class ChangeAnswerDialog(QDialog):
@@ -93,6 +93,10 @@ class TestSettings(QWidget):
         self.automatic_slide_next = QCheckBox()
         options.layout().addRow("Otomatis pindah soal", self.automatic_slide_next)
 
+        # Change question without the slide animation
+        self.instant_slide = QCheckBox()
+        options.layout().addRow("Pindah soal tanpa animasi", self.instant_slide)
+
         ###############################
         # Buttons
         ###############################
@@ -156,6 +160,7 @@ class TestSettings(QWidget):
             show_doubt_button=self.show_doubt_buttons.isChecked(),
             question_options=self.option_preview.text().split(", "),
             automatic_slide_next=self.automatic_slide_next.isChecked(),
+            instant_slide=self.instant_slide.isChecked(),
         )
         self.root.addWidget(test_widget)
         self.root.slideInNext()
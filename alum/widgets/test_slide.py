@@ -1,21 +1,210 @@
 from math import ceil
+import time
 
 from PySide6.QtWidgets import (
-    QGridLayout,
     QHBoxLayout,
     QLabel,
     QMessageBox,
     QPushButton,
     QScrollArea,
     QSizePolicy,
+    QStyle,
+    QStyleOptionButton,
     QVBoxLayout,
     QWidget,
 )
-from PySide6.QtCore import QTimer, Qt, Signal
+from PySide6.QtCore import QRect, QTimer, Qt, Signal
+from PySide6.QtGui import QColor, QPainter
 
-from .custom_widgets import SlidingStackedWidget
+from .custom_widgets import RapidEntry, SlidingStackedWidget, make_option_button, set_state
 from .answer_slide import AnswerKeySlide
-from ..constants import BLUE_1, BLUE_2, GREEN_BTN_QSS, RED_BTN_QSS
+from ..constants import (
+    BLUE_1,
+    CHECKPOINT_INTERVAL,
+    CLOCK_TICK,
+    GREEN_BTN_QSS,
+    RED_BTN_QSS,
+    YELLOW,
+)
+from ..storage import event_log
+from ..storage.checkpoint import SessionCheckpointer
+from ..storage.codec import NO_ANSWER
+from ..storage.store import DataStore
+
+
+# State of every question in a test session,
+# the answer views only show the question they are bound to.
+# The time is kept as time.monotonic_ns timestamps: when the session started,
+# every visit to a question (focus enter and focus leave) and every pause,
+# the durations are derived from them, so nothing is lost between timer ticks.
+# Every change goes through the methods below and is recorded in the event log.
+class TestSession:
+    def __init__(self, first_question_num: int, question_counts: int, question_options: list):
+        self.first_question_num = first_question_num
+        self.question_counts = question_counts
+        self.last_question_num = first_question_num + question_counts - 1
+        self.option_index = {option: idx for idx, option in enumerate(question_options)}
+        self.option_index[""] = NO_ANSWER
+
+        numbers = range(first_question_num, first_question_num + question_counts)
+        self.answers = {num: "" for num in numbers}
+        self.doubts = set()
+
+        # Clock
+        self.start_ns = None
+        self.end_ns = None
+        self.visits = {num: [] for num in numbers}  # num -> [[enter, leave], ...]
+        self.pauses = []  # [[start, end], ...]
+        self.current_visit = None  # the visit with no leave yet
+        self.focused = None  # question that is focused, even while paused
+
+        self.log = event_log.EventLog()
+
+    def is_first(self, num: int) -> bool:
+        return num == self.first_question_num
+
+    def is_last(self, num: int) -> bool:
+        return num == self.last_question_num
+
+    # Choosing the answer that is already chosen is not a change, nothing is recorded
+    def set_answer(self, num: int, answer: str, now: int = None):
+        if self.answers[num] == answer:
+            return
+        self.answers[num] = answer
+        self.log.record(
+            self.now() if now is None else now,
+            event_log.ANSWER,
+            num - self.first_question_num,
+            self.option_index[answer],
+        )
+
+    def toggle_doubt(self, num: int, now: int = None):
+        self.doubts ^= {num}
+        self.log.record(
+            self.now() if now is None else now,
+            event_log.DOUBT,
+            num - self.first_question_num,
+            num in self.doubts,
+        )
+
+    ##########################################
+    # Clock
+    ##########################################
+    def now(self) -> int:
+        return time.monotonic_ns()
+
+    def start(self, num: int):
+        self.start_ns = self.now()
+        self.log.record(self.start_ns, event_log.START)
+        self.focus(num, self.start_ns)
+
+    # The time of question num starts counting, the previous question stops
+    def focus(self, num: int, now: int = None):
+        now = self.now() if now is None else now
+        self.leave(now)
+        self.focused = num
+        self.log.record(now, event_log.FOCUS, num - self.first_question_num)
+        if not self.is_paused():
+            self.enter(num, now)
+
+    def enter(self, num: int, now: int):
+        self.current_visit = [now, None]
+        self.visits[num].append(self.current_visit)
+
+    def leave(self, now: int):
+        if self.current_visit is not None:
+            self.current_visit[1] = now
+            self.current_visit = None
+
+    def is_paused(self) -> bool:
+        return bool(self.pauses) and self.pauses[-1][1] is None
+
+    def pause(self, now: int = None):
+        now = self.now() if now is None else now
+        self.leave(now)
+        self.pauses.append([now, None])
+        self.log.record(now, event_log.PAUSE)
+
+    def resume(self, now: int = None):
+        now = self.now() if now is None else now
+        self.pauses[-1][1] = now
+        self.log.record(now, event_log.RESUME)
+        self.enter(self.focused, now)
+
+    def stop(self, now: int = None):
+        if self.end_ns is not None:
+            return
+        now = self.now() if now is None else now
+        if self.is_paused():
+            self.resume(now)
+        self.end_ns = now
+        self.leave(self.end_ns)
+        self.log.record(self.end_ns, event_log.FINISH)
+
+    def is_finished(self) -> bool:
+        return self.end_ns is not None
+
+    # Time spent on question num, in milliseconds
+    def question_time(self, num: int) -> int:
+        now = self.now()
+        total = sum((leave or now) - enter for enter, leave in self.visits[num])
+        return total // 1_000_000
+
+    # Time spent since the start without the pauses, in milliseconds
+    def total_time(self) -> int:
+        end = self.end_ns or self.now()
+        paused = sum((pause_end or end) - start for start, pause_end in self.pauses)
+        return (end - self.start_ns - paused) // 1_000_000
+
+    def question_times(self) -> dict:
+        return {num: self.question_time(num) for num in self.visits}
+
+    # Milliseconds since the start, pauses included (the time axis of the event log),
+    # it stops with the session
+    def elapsed(self) -> int:
+        end = self.end_ns or self.now()
+        return (end - self.start_ns) // 1_000_000
+
+    # Rebuild a session from its event log (see checkpoint.py),
+    # elapsed is the time of the session at the last checkpoint,
+    # the clocks continue from there as if no time has passed since then.
+    # A finished session stays finished, its clocks stopped at the FINISH event
+    @classmethod
+    def restore(
+        cls,
+        first_question_num: int,
+        question_counts: int,
+        question_options: list,
+        events,
+        times,
+        elapsed: int,
+    ) -> "TestSession":
+        session = cls(first_question_num, question_counts, question_options)
+        start = session.now() - elapsed * 1_000_000
+        for event, time in zip(events, times):
+            kind, idx, value = event_log.decode_event(event)
+            num = first_question_num + idx
+            now = start + time * 1_000_000
+            if kind == event_log.START:
+                session.start_ns = now
+                session.log.record(now, event_log.START)
+            elif kind == event_log.FOCUS:
+                session.focus(num, now)
+            elif kind == event_log.ANSWER:
+                answer = "" if value == NO_ANSWER else question_options[value]
+                session.set_answer(num, answer, now)
+            elif kind == event_log.DOUBT:
+                session.toggle_doubt(num, now)
+            elif kind == event_log.PAUSE:
+                session.pause(now)
+            elif kind == event_log.RESUME:
+                session.resume(now)
+            elif kind == event_log.FINISH:
+                session.stop(now)
+
+        if session.is_paused():
+            session.resume()
+        return session
 
 
 # Test view slide
@@ -30,6 +219,8 @@ class TestWidget(QWidget):
         show_doubt_button: bool,
         question_options: list,
         automatic_slide_next: bool,
+        instant_slide: bool = False,
+        session: TestSession = None,
     ):
         super().__init__()
         self.time_limit = time_limit
@@ -40,32 +231,38 @@ class TestWidget(QWidget):
         self.show_doubt_button = show_doubt_button
         self.question_options = question_options
         self.automatic_slide_next = automatic_slide_next
+        self.instant_slide = instant_slide
 
         self.setLayout(QHBoxLayout())
 
-        # Inner state
-        self.answers = {}
-        for num in range(
-            self.first_question_num,
-            self.first_question_num + self.question_counts,
-        ):
-            self.answers[num] = ""
-        self.current_question = self.first_question_num
-
-        # Timer
-        self.total_timer = QTimer(self)
-        # If time limit have not been set
-        if self.time_limit == 0:
-            # HACK if I set it to -1, it will start at 00:00
-            self.total_time_counter = -1
-            self.timer_delta = 1  # Increase time
-        else:
-            # HACK if I add 1 here, it will start at the time limit (ex: 10:00)
-            self.total_time_counter = self.time_limit * 60 + 1
-            self.timer_delta = -1  # Decrease time
-        self.total_timer.setInterval(1000)  # 1 seconds
-        self.total_timer.timeout.connect(self.update_timer)
-        self.total_timer.start()
+        # Inner state, a session restored from a checkpoint goes on from where it was
+        if session is None:
+            session = TestSession(
+                self.first_question_num, self.question_counts, self.question_options
+            )
+            session.start(self.first_question_num)
+        self.session = session
+        self.answers = self.session.answers
+        self.current_question = self.session.focused
+
+        # Checkpoints of the session, so it can be resumed after a crash
+        self.last_checkpoint = self.session.elapsed()
+        self.checkpointer = SessionCheckpointer(
+            DataStore.instance().root_path,
+            self.settings(),
+            self.session.log,
+            self.last_checkpoint,
+        )
+
+        # Timer, only refreshes the time labels, the time itself is kept by the session
+        self.timer = QTimer(self)
+        self.timer.setInterval(CLOCK_TICK)
+        self.timer.timeout.connect(self.tick)
+        if not self.session.is_finished():
+            self.timer.start()
+            # A restored session may already be out of time, the test can only be
+            # finished once this widget is in the slides
+            QTimer.singleShot(0, self.check_time_limit)
 
         ###################################################
         # Left Side section
@@ -88,26 +285,8 @@ class TestWidget(QWidget):
         self.questions_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.questions_scroll.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Expanding)
         self.questions_scroll.setStyleSheet("QScrollArea {border:none}")
-        self.questions_list = QWidget()
-        self.questions_list.setLayout(QGridLayout())
-        self.questions_list.layout().setAlignment(Qt.AlignTop)
-        self.questions_list.setContentsMargins(0, 0, 15, 0)
-        ## Grid logic, just trust me
-        positions = [
-            (i, j) for i in range(ceil(self.question_counts / 4)) for j in range(4)
-        ]
-        for pos, num in zip(
-            positions,
-            range(
-                self.first_question_num,
-                self.first_question_num + self.question_counts,
-            ),
-        ):
-            button = QuestionNumberButton(str(num), objectName=f"questionButton{num}")
-            button.setFixedSize(42, 42)
-            button.clicked.connect(self.go_to_question)
-            self.questions_list.layout().addWidget(button, *pos)
-        ##
+        self.questions_list = QuestionNavigator(self.session)
+        self.questions_list.questionClicked.connect(self.change_question_view)
         self.questions_scroll.setWidget(self.questions_list)
         self.left_section.layout().addWidget(self.questions_scroll)
 
@@ -143,23 +322,16 @@ class TestWidget(QWidget):
         self.top_buttons_cont.layout().addWidget(self.finish_btn)
 
         # Answer slide
+        # Only two answer views, no matter how many questions there are:
+        # the one that is shown, and the one that slides in bound to the next question
         self.answers_slide = SlidingStackedWidget()
+        self.answers_slide.setInstant(self.instant_slide)
         self.right_section.layout().addWidget(self.answers_slide)
 
-        for num in range(
-            self.first_question_num,
-            self.first_question_num + self.question_counts,
-        ):
-            is_first = num == self.first_question_num
-            is_last = num == (self.first_question_num + self.question_counts - 1)
-
+        for _ in range(2):
             answer_view = AnswerWidget(
-                question_num=num,
                 question_options=self.question_options,
                 show_question_time=self.show_question_time,
-                question_counts=self.question_counts,
-                is_first=is_first,
-                is_last=is_last,
                 show_doubt_button=self.show_doubt_button,
             )
             answer_view.answerChanged.connect(self.change_answer)
@@ -168,41 +340,104 @@ class TestWidget(QWidget):
             answer_view.finishButtonClicked.connect(self.finish_test)
             self.answers_slide.addWidget(answer_view)
 
-        # To prevent user from changing question too fast
-        self.still_sliding = False
-        self.sliding_timer = QTimer(self)
-        self.sliding_timer.setInterval(self.answers_slide.m_speed)
-        self.sliding_timer.timeout.connect(self.sliding_timer_timeout)
+        # The answer view follows the current question on the next pass of the event loop
+        self.shown_view = self.answers_slide.currentWidget()
+        self.view_pending = False
 
-        # Set style and other things after all things have been done
-        self.change_question_view(self.current_question)
-
-    # Just to make things easier
-    def get_answer_slide(self, num: int):
-        answers_slide: AnswerWidget = self.answers_slide.findChild(
-            AnswerWidget, f"answerWidget{num}"
+        # Keyboard entry: "1a2c3e" answers question 1 with A, 2 with C, 3 with E
+        self.rapid_entry = RapidEntry(
+            self.first_question_num,
+            self.session.last_question_num,
+            self.question_options,
+            jump=self.change_question_view,
+            answer=self.type_answer,
         )
-        return answers_slide
 
-    def get_question_btn(self, num: int):
-        question_btn: QuestionNumberButton = self.left_section.findChild(
-            QPushButton, f"questionButton{num}"
+        # Set style and other things after all things have been done
+        self.bind_answer_view(self.current_view(), self.current_question)
+        self.highlight_selected_qb(self.current_question, self.current_question)
+
+    # The answer view that is shown, or sliding in
+    def current_view(self):
+        answer_view: AnswerWidget = self.shown_view
+        return answer_view
+
+    # Show the state of question num in answer_view
+    def bind_answer_view(self, answer_view, num: int):
+        answer_view.bind(
+            question_num=num,
+            answer=self.session.answers[num],
+            doubt=num in self.session.doubts,
+            time_spent=self.session.question_time(num),
+            is_first=self.session.is_first(num),
+            is_last=self.session.is_last(num),
         )
-        return question_btn
 
-    # Called every tick
+
+    # The arguments of this widget, to build it again when the session is resumed
+    def settings(self) -> dict:
+        return {
+            "time_limit": self.time_limit,
+            "show_total_time": self.show_total_time,
+            "show_question_time": self.show_question_time,
+            "question_counts": self.question_counts,
+            "first_question_num": self.first_question_num,
+            "show_doubt_button": self.show_doubt_button,
+            "question_options": self.question_options,
+            "automatic_slide_next": self.automatic_slide_next,
+            "instant_slide": self.instant_slide,
+        }
+
+    # Called every tick, the only thing that refreshes the time labels
+    def tick(self):
+        view = self.current_view()
+        view.show_time(self.session.question_time(view.question_num))
+        self.update_timer()
+        self.check_time_limit()
+
+        elapsed = self.session.elapsed()
+        if elapsed - self.last_checkpoint >= CHECKPOINT_INTERVAL:
+            self.save_checkpoint()
+
+    # Only the events since the last checkpoint are handed to the checkpoint writer
+    def save_checkpoint(self):
+        if self.checkpointer is None:
+            return
+        self.last_checkpoint = self.session.elapsed()
+        self.checkpointer.checkpoint(self.session.log, self.last_checkpoint)
+
+    # No more checkpoints, remove is True if the session is over (saved or canceled),
+    # else the checkpoint is kept to be resumed on the next run.
+    # A finished session was written for the last time by finish_test
+    def close_checkpoint(self, remove: bool):
+        if self.checkpointer is None:
+            return
+        if not remove and not self.session.is_finished():
+            self.save_checkpoint()
+        self.checkpointer.close(remove)
+        self.checkpointer = None
+
+    # time spent if there is no time limit, else time remaining
     def update_timer(self):
-        # Update count by adding delta (1 to increase and -1 to decrease)
-        self.total_time_counter += self.timer_delta
+        total_time = self.session.total_time()
+        if self.time_limit == 0:
+            time_shown = total_time // 1000
+        else:
+            remaining = self.time_limit * 60_000 - total_time
+            time_shown = max(0, -(-remaining // 1000))  # rounded up
+
         if self.show_total_time:
-            seconds = str(self.total_time_counter % 60).zfill(2)
-            minutes = str(self.total_time_counter // 60).zfill(2)
+            seconds = str(time_shown % 60).zfill(2)
+            minutes = str(time_shown // 60).zfill(2)
             self.time_remaining.setText(f"{minutes}:{seconds}")
         else:
             self.time_remaining.setText(self.time_hidden_text)
 
-        # If time_limit is up
-        if self.time_limit != 0 and self.total_time_counter == 0:
+    # Finish the test if time_limit is up
+    def check_time_limit(self):
+        if self.time_limit == 0 or self.session.is_finished():
+            return
+        if self.session.total_time() >= self.time_limit * 60_000:
             self.finish_test(time_up=True)
 
     # Toggle show time when time remaing label is clicked
@@ -211,51 +446,64 @@ class TestWidget(QWidget):
         self.update_timer()
 
     # This will only be called outside of this class
-    # Get time spent in each questions
+    # Get time spent in each questions, in milliseconds
     def get_questions_time(self) -> dict:
-        # Imma steal it from self.answers for the key
-        question_times = self.answers.copy()
-        for num in question_times.keys():
-            answer_widget = self.get_answer_slide(num)
-            question_times[num] = answer_widget.timer_count
-        return question_times
-
-    # Callback when button in self.questions_list is clicked
-    def go_to_question(self):
-        num = int(self.sender().text())
-        self.change_question_view(num)
-
-    # The only function to call when user want to change question view
-    # stop previous answer timer, and start the next answer timer
+        return self.session.question_times()
+
+    # Time spent in the whole test, in milliseconds
+    def get_total_time(self) -> int:
+        total_time = self.session.total_time()
+        if self.time_limit != 0:
+            total_time = min(total_time, self.time_limit * 60_000)
+        return total_time
+
+    # The only function to call when user want to change question view.
+    # The question changes right away (navigator and clock), the answer view is only
+    # updated on the next pass of the event loop, so moves that come in quicker than that
+    # are merged and only the latest one slides in. No move is ever dropped.
     def change_question_view(self, question_num: int):
-        if self.still_sliding:
+        if question_num == self.current_question:
             return
-        current_answer = self.get_answer_slide(question_num)
-        previous_answer = self.get_answer_slide(self.current_question)
         self.highlight_selected_qb(self.current_question, question_num)
-        # Timer
-        previous_answer.stop_timer()
-        current_answer.start_timer()
-        ###
+        self.session.focus(question_num)
         self.current_question = question_num
-        self.answers_slide.slideInWgt(current_answer)
-
-        # Prevent user from changing question too fast
-        self.still_sliding = True
-        self.sliding_timer.start()
+        self.update_view_later()
+
+    def update_view_later(self):
+        if not self.view_pending:
+            self.view_pending = True
+            QTimer.singleShot(0, self.show_current_question)
+
+    # The spare answer view is bound to the current question and slides in,
+    # the slide that is still going on is finished first
+    def show_current_question(self):
+        self.view_pending = False
+        self.answers_slide.finishSlide()
+        shown_num = self.current_view().question_num
+        if shown_num == self.current_question:
+            self.bind_answer_view(self.current_view(), shown_num)
+            return
 
-    def sliding_timer_timeout(self):
-        self.sliding_timer.stop()
-        self.still_sliding = False
+        # The spare view goes after the current view when moving forward,
+        # and before it when moving back, so it slides from the right side
+        next_view = self.answers_slide.widget(1 - self.answers_slide.currentIndex())
+        self.answers_slide.removeWidget(next_view)
+        if self.current_question > shown_num:
+            self.answers_slide.addWidget(next_view)
+        else:
+            self.answers_slide.insertWidget(0, next_view)
+        self.bind_answer_view(next_view, self.current_question)
+        self.shown_view = next_view
+        self.answers_slide.slideInWgt(next_view)
 
     # Pause test, stop question buttons and total timer and show messagebox
     # continue the test after the messagebox is closed
     def pause_test(self):
         qm = QMessageBox
 
-        question_slide = self.get_answer_slide(self.current_question)
-        question_slide.stop_timer()
-        self.total_timer.stop()
+        self.session.pause()
+        self.timer.stop()
+        self.save_checkpoint()
 
         _ = qm().information(
             self,
@@ -264,27 +512,21 @@ class TestWidget(QWidget):
             qm.Ok,
         )
 
-        question_slide.start_timer()
-        self.total_timer.start()
+        self.session.resume()
+        self.timer.start()
 
-    # Highlight selected question button
+    # Highlight selected question in the navigator, and scroll to it
     def highlight_selected_qb(self, prev: int, next: int):
-        selected_style = f"background-color: {BLUE_1};color: white;"
-        # Remove previous style
-        prev = self.get_question_btn(prev)
-        prev_style = prev.styleSheet()
-        prev.setStyleSheet(prev_style.replace(selected_style, ""))
-        # Add style to current
-        current = self.get_question_btn(next)
-        current.setStyleSheet(current.styleSheet() + selected_style)
+        self.questions_list.set_current(next)
+        rect = self.questions_list.cell_rect(next)
+        self.questions_scroll.ensureVisible(rect.center().x(), rect.center().y())
 
     # Higlight question button in Question List to yellow,
     # changed data, and slide to next if the user set automatic_slide_next
     def change_answer(self, num: int, answer: str):
+        self.session.set_answer(num, answer)
         # Question button in the left side
-        q_btn_ls = self.get_question_btn(num)
-        q_btn_ls.setStyleSheet(q_btn_ls.styleSheet() + "border: 1px solid #FFD54F;")
-        self.answers[num] = answer
+        self.questions_list.update_question(num)
 
         # Slide to the next question if automatic_slide_next is True
         if self.automatic_slide_next:
@@ -298,8 +540,26 @@ class TestWidget(QWidget):
     # This will only get called outside of this function,
     # at AnswerWidget.doubt_button_click
     def doubt_question(self, num: int):
-        qb_ls = self.get_question_btn(num)
-        qb_ls.toggle_doubt()
+        self.session.toggle_doubt(num)
+        self.questions_list.update_question(num)
+
+    # Keys go to the keyboard entry first (see RapidEntry)
+    def keyPressEvent(self, event):
+        if event.modifiers() & (Qt.ControlModifier | Qt.AltModifier):
+            super().keyPressEvent(event)
+        elif not self.rapid_entry.feed(event.text()):
+            super().keyPressEvent(event)
+
+    # An option typed on the keyboard, only the state and the navigator cell change now,
+    # the answer view is updated once on the next pass of the event loop
+    def type_answer(self, answer: str):
+        self.change_answer(self.current_question, answer)
+        self.update_view_later()
+
+    # The navigator gets the keys first (arrow keys), the rest come to this widget
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.questions_list.setFocus()
 
     # Slide back to previous slide, which is settings
     # this widget will later be deleted when the user start a new test
@@ -316,9 +576,9 @@ class TestWidget(QWidget):
         if res == qm.No:
             return
 
-        current_answer = self.get_answer_slide(self.current_question)
-        current_answer.stop_timer()
-        self.total_timer.stop()
+        self.session.stop()
+        self.timer.stop()
+        self.close_checkpoint(remove=True)
         self.parent().slideInPrev()
 
     def finish_test(self, time_up: bool = False):
@@ -327,6 +587,8 @@ class TestWidget(QWidget):
         # if time_up is True, then there will be no confirmation dialog
         # even if the user the have not completed all the questions yet
         if time_up:
+            self.session.stop()
+            self.timer.stop()
             qm.information(
                 self, "Waktu habis", "Maaf, waktu pengerjaan soal telah habis", qm.Ok
             )
@@ -341,55 +603,161 @@ class TestWidget(QWidget):
             if res == qm.No:
                 return
 
-        # Stop timer
-        self.total_timer.stop()
-        current_answer = self.get_answer_slide(self.current_question)
-        current_answer.timer.stop()
+        # Stop timer, the last checkpoint has the end of the session,
+        # it's kept until the test is saved
+        self.session.stop()
+        self.timer.stop()
+        self.save_checkpoint()
+
+        self.parent().addWidget(self.answer_key_slide())
+        self.parent().slideInNext()
 
-        # Start answer key widget
-        answer_key = AnswerKeySlide(
+    # Answer key widget, the slide after this one
+    def answer_key_slide(self) -> AnswerKeySlide:
+        return AnswerKeySlide(
             first_question_num=self.first_question_num,
             question_counts=self.question_counts,
             question_options=self.question_options,
         )
-        self.parent().addWidget(answer_key)
-        self.parent().slideInNext()
 
 
-# Question number button on the left side
-class QuestionNumberButton(QPushButton):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.setLayout(QVBoxLayout())
-        self.setStyleSheet("padding: 0;")
-
-        # Add small widget at the top left of the button
-        self.notification = QWidget()
-        self.notification.setFixedSize(10, 10)
-        self.notification.setStyleSheet(
-            "background-color: #FFD54F; border-radius: 2.5px;border:none;"
-        )
-        self.layout().setAlignment(
-            Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignTop
-        )
-        self.layout().setContentsMargins(0, 0, 0, 0)
-        self.layout().addWidget(self.notification)
+# Question numbers on the left side, every cell is painted by this one widget.
+# A cell shows the state of the question in the session:
+# current (blue), answered (yellow border), and doubt (yellow mark at the top right)
+class QuestionNavigator(QWidget):
+    COLUMNS = 4
+    CELL_SIZE = 42
+    SPACING = 6
+    MARK_SIZE = 10
 
-        # Inner state
-        self.doubt = False
-        self.toggle_doubt()
+    questionClicked = Signal(int)
 
-    # This will only be used in TestWidget,
-    # because this function can only be triggered
-    # by button in AnswerWidget
-    def toggle_doubt(self):
-        self.notification.setVisible(self.doubt)
-        self.doubt = not self.doubt
+    def __init__(self, session: TestSession):
+        super().__init__()
+        self.session = session
+        self.current = session.first_question_num
+        self.hovered = None
+
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setMouseTracking(True)
+        rows = ceil(session.question_counts / self.COLUMNS)
+        step = self.CELL_SIZE + self.SPACING
+        # Space on the right for the scroll bar
+        self.setFixedSize(self.COLUMNS * step + 15, rows * step)
+
+    def cell_rect(self, num: int) -> QRect:
+        idx = num - self.session.first_question_num
+        row, column = divmod(idx, self.COLUMNS)
+        step = self.CELL_SIZE + self.SPACING
+        return QRect(column * step, row * step, self.CELL_SIZE, self.CELL_SIZE)
+
+    # Question number at pos, None if there is no cell there
+    def question_at(self, pos) -> int:
+        step = self.CELL_SIZE + self.SPACING
+        column, x = divmod(int(pos.x()), step)
+        row, y = divmod(int(pos.y()), step)
+        if column >= self.COLUMNS or x >= self.CELL_SIZE or y >= self.CELL_SIZE:
+            return None
+        idx = row * self.COLUMNS + column
+        if not 0 <= idx < self.session.question_counts:
+            return None
+        return self.session.first_question_num + idx
+
+    # Repaint only the cell of question num
+    def update_question(self, num: int):
+        if num is not None:
+            self.update(self.cell_rect(num))
+
+    def set_current(self, num: int):
+        prev, self.current = self.current, num
+        self.update_question(prev)
+        self.update_question(num)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        style = self.style()
+
+        # Only the cells inside the dirty rect
+        step = self.CELL_SIZE + self.SPACING
+        dirty = event.rect()
+        first_row = dirty.top() // step
+        last_row = dirty.bottom() // step
+        first = self.session.first_question_num + first_row * self.COLUMNS
+        last = min(
+            self.session.last_question_num,
+            self.session.first_question_num + (last_row + 1) * self.COLUMNS - 1,
+        )
+        for num in range(first, last + 1):
+            rect = self.cell_rect(num)
+            if not rect.intersects(dirty):
+                continue
+
+            if num == self.current:
+                painter.fillRect(rect, QColor(BLUE_1))
+                painter.setPen(QColor("white"))
+                painter.drawText(rect, Qt.AlignCenter, str(num))
+            else:
+                button = QStyleOptionButton()
+                button.initFrom(self)
+                button.rect = rect
+                button.text = str(num)
+                button.state = QStyle.State_Enabled
+                if num == self.hovered:
+                    button.state |= QStyle.State_MouseOver
+                style.drawControl(QStyle.CE_PushButton, button, painter, self)
+
+            if self.session.answers[num] != "":
+                painter.setPen(QColor(YELLOW))
+                painter.drawRect(rect.adjusted(0, 0, -1, -1))
+            if num in self.session.doubts:
+                mark = QRect(
+                    rect.right() - self.MARK_SIZE + 1, rect.top(), self.MARK_SIZE, self.MARK_SIZE
+                )
+                painter.setPen(Qt.NoPen)
+                painter.setBrush(QColor(YELLOW))
+                painter.drawRoundedRect(mark, 2.5, 2.5)
+                painter.setBrush(Qt.NoBrush)
+
+    def mouseMoveEvent(self, event):
+        num = self.question_at(event.position())
+        if num != self.hovered:
+            prev, self.hovered = self.hovered, num
+            self.update_question(prev)
+            self.update_question(num)
+
+    def leaveEvent(self, event):
+        prev, self.hovered = self.hovered, None
+        self.update_question(prev)
+
+    def mouseReleaseEvent(self, event):
+        num = self.question_at(event.position())
+        if event.button() == Qt.LeftButton and num is not None:
+            self.questionClicked.emit(num)
+
+    # Arrow keys move to the question next to the current one
+    def keyPressEvent(self, event):
+        moves = {
+            Qt.Key_Left: -1,
+            Qt.Key_Right: 1,
+            Qt.Key_Up: -self.COLUMNS,
+            Qt.Key_Down: self.COLUMNS,
+        }
+        if event.key() in moves:
+            num = self.current + moves[event.key()]
+        elif event.key() == Qt.Key_Home:
+            num = self.session.first_question_num
+        elif event.key() == Qt.Key_End:
+            num = self.session.last_question_num
+        else:
+            super().keyPressEvent(event)
+            return
+        if self.session.first_question_num <= num <= self.session.last_question_num:
+            self.questionClicked.emit(num)
 
 
 ###############################################################################################
 
-# Answer widget for each slide
+# Answer view, shows the question it is bound to (see TestWidget.bind_answer_view)
 class AnswerWidget(QWidget):
     # Signal
     doubtButtonClicked = Signal(int)
@@ -399,36 +767,23 @@ class AnswerWidget(QWidget):
 
     def __init__(
         self,
-        question_num: int,
         question_options: list,
         show_question_time: bool,
-        question_counts: int,
-        is_first: bool,
-        is_last: bool,
         show_doubt_button: bool,
     ):
         super().__init__()
 
-        self.question_num = question_num
         self.show_question_time = show_question_time
         self.question_options = question_options
-        self.question_counts = question_counts
-        self.is_first = is_first
-        self.is_last = is_last
         self.show_doubt_button = show_doubt_button
 
         self.setLayout(QVBoxLayout())
-        self.setObjectName(f"answerWidget{self.question_num}")
 
-        # Inner state
+        # Inner state, set by bind
+        self.question_num = 0
         self.current_answer = ""
-
-        # Inner timer
-        self.timer = QTimer()
-        self.timer_on = False
-        self.timer_count = 0
-        self.timer.setInterval(1000)  # 1 second
-        self.timer.timeout.connect(self.timer_update)
+        self.is_last = False
+        self.time_shown = -1
 
         ##########################################
         ## Top section (timer, question number)
@@ -443,12 +798,11 @@ class AnswerWidget(QWidget):
             self.question_time.setText("00:00")
             self.question_time.setStyleSheet("font-size: 18px;")
             self.question_time.setAlignment(Qt.AlignTop)
-            self.timer_update()
         self.question_time.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
         self.top_section.layout().addWidget(self.question_time)
 
         # Number
-        self.number_text = QLabel(str(question_num))
+        self.number_text = QLabel()
         self.number_text.setFixedSize(60, 60)
         self.number_text.setStyleSheet(
             """
@@ -475,9 +829,12 @@ class AnswerWidget(QWidget):
         self.layout().addWidget(self.middle_section)
 
         # Answer option buttons
+        self.option_buttons = {}
         for option in self.question_options:
-            button = SquareButton(option, objectName=f"answerButton{option}")
+            button = make_option_button(option, SquareButton)
+            button.setObjectName(f"answerButton{option}")
             button.clicked.connect(self.choose_answer)
+            self.option_buttons[option] = button
             button_font = button.font()
             button_font.setPointSize(24)
             button.setFont(button_font)
@@ -492,12 +849,12 @@ class AnswerWidget(QWidget):
         self.layout().addWidget(self.bottom_section)
 
         # Previous question button
-        # hide the button if this is the first question
-        if self.is_first:
-            self.prev_button = QWidget()
-        else:
-            self.prev_button = QPushButton("<- Sebelumnya")
-            self.prev_button.clicked.connect(lambda: self.change_question(-1))
+        # hidden (but still taking its space) if this is the first question
+        self.prev_button = QPushButton("<- Sebelumnya")
+        self.prev_button.clicked.connect(lambda: self.change_question(-1))
+        prev_size_policy = self.prev_button.sizePolicy()
+        prev_size_policy.setRetainSizeWhenHidden(True)
+        self.prev_button.setSizePolicy(prev_size_policy)
         self.bottom_section.layout().addWidget(self.prev_button)
 
         # Doubt buttons
@@ -511,16 +868,36 @@ class AnswerWidget(QWidget):
         self.bottom_section.layout().addWidget(self.doubt_button)
 
         # Next question button
-        # if this is the last question, then change the button to "Finish button"
-        if self.is_last:
-            self.next_button = QPushButton("Selesai")
-            self.next_button.setStyleSheet(GREEN_BTN_QSS)
-            self.next_button.clicked.connect(self.finishButtonClicked.emit)
-        else:
-            self.next_button = QPushButton("Berikutnya ->")
-            self.next_button.clicked.connect(lambda: self.change_question(1))
+        # if this is the last question, then it's the "Finish button"
+        self.next_button = QPushButton()
+        self.next_button.clicked.connect(self.next_button_click)
         self.bottom_section.layout().addWidget(self.next_button)
 
+    # Show the state of question_num
+    def bind(
+        self,
+        question_num: int,
+        answer: str,
+        doubt: bool,
+        time_spent: int,
+        is_first: bool,
+        is_last: bool,
+    ):
+        self.question_num = question_num
+        self.is_last = is_last
+        self.number_text.setText(str(question_num))
+
+        self.highlight_answer(self.current_answer, answer)
+        self.current_answer = answer
+
+        if self.show_doubt_button:
+            self.doubt_button.setChecked(doubt)
+        self.show_time(time_spent)
+
+        self.prev_button.setVisible(not is_first)
+        self.next_button.setText("Selesai" if is_last else "Berikutnya ->")
+        set_state(self.next_button, "finish", is_last)
+
     # Callback when choosing answer
     def choose_answer(self):
         new_answer = self.sender().text()
@@ -529,21 +906,24 @@ class AnswerWidget(QWidget):
         self.answerChanged.emit(self.question_num, new_answer)
 
     # Highlight option button
-    # if the previous answer has been selected, remove the style
-    # then, highlight the new answer
+    # if the previous answer has been selected, uncheck it
+    # then, check the new answer (clicking the chosen answer again keeps it)
     def highlight_answer(self, prev_answer, answer):
         if prev_answer != "":
-            prev = self.middle_section.findChild(
-                QPushButton, f"answerButton{prev_answer}"
-            )
-            prev.setStyleSheet("")
-        current = self.middle_section.findChild(QPushButton, f"answerButton{answer}")
-        current.setStyleSheet(f"background: {BLUE_2};color: white;")
+            self.option_buttons[prev_answer].setChecked(False)
+        if answer != "":
+            self.option_buttons[answer].setChecked(True)
 
     # idx_move is either 1 (next) or -1 (previous)
     def change_question(self, idx_move):
         self.moveToQuestion.emit(self.question_num + idx_move)
 
+    def next_button_click(self):
+        if self.is_last:
+            self.finishButtonClicked.emit()
+        else:
+            self.change_question(1)
+
     def doubt_button_click(self):
         # If user haven't select any answer
         if self.current_answer == "":
@@ -552,21 +932,13 @@ class AnswerWidget(QWidget):
         self.doubtButtonClicked.emit(self.question_num)
 
     ### TIMER
-    def start_timer(self):
-        self.timer_on = True
-        self.timer.start()
-
-    def stop_timer(self):
-        self.timer_on = False
-        self.timer.stop()
-
-    def timer_update(self):
-        if self.timer_on == False:
-            return
-        self.timer_count += 1
-        if self.show_question_time:
-            seconds = str(self.timer_count % 60).zfill(2)
-            minutes = str(self.timer_count // 60).zfill(2)
+    # time_spent is in milliseconds, the label is only changed every second
+    def show_time(self, time_spent: int):
+        time_spent //= 1000
+        if self.show_question_time and time_spent != self.time_shown:
+            self.time_shown = time_spent
+            seconds = str(time_spent % 60).zfill(2)
+            minutes = str(time_spent // 60).zfill(2)
             self.question_time.setText(f"{minutes}:{seconds}")
 
 
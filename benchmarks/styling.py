@@ -0,0 +1,97 @@
+# Per-click cost of highlighting an answer option
+# > stylesheet: the old way, the stylesheet of the button is concatenated / replaced
+# > property: the buttons stay checked and the "option" property of APP_QSS
+#   (QPushButton[option="true"]:checked, the rule of the answer buttons) is flipped,
+#   the button is polished again
+# > checked: the option buttons are checked / unchecked, matched by APP_QSS without a polish
+# Run from the root of the repo: python benchmarks/styling.py
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtWidgets import QApplication, QHBoxLayout, QPushButton, QWidget
+import qdarktheme
+
+from alum.constants import APP_QSS, BLUE_2
+from alum.widgets.custom_widgets import make_option_button, set_state
+
+CLICKS = 2000
+OPTIONS = "ABCDE"
+
+
+def make_buttons(make_button=QPushButton) -> tuple:
+    widget = QWidget()
+    layout = QHBoxLayout(widget)
+    buttons = []
+    for option in OPTIONS:
+        button = make_button(option)
+        layout.addWidget(button)
+        buttons.append(button)
+    widget.show()
+    return widget, buttons
+
+
+# Checked buttons that only match the answer button rule once "option" is set
+def make_checked_button(option: str) -> QPushButton:
+    button = QPushButton(option)
+    button.setCheckable(True)
+    button.setChecked(True)
+    return button
+
+
+def stylesheet_clicks(app: QApplication, buttons: list) -> float:
+    highlight_style = f"background: {BLUE_2};color: white;"
+    selected = None
+    start = time.perf_counter()
+    for click in range(CLICKS):
+        button = buttons[click % len(buttons)]
+        if selected is not None:
+            selected.setStyleSheet(selected.styleSheet().replace(highlight_style, ""))
+        button.setStyleSheet(button.styleSheet() + highlight_style)
+        selected = button
+        app.processEvents()
+    return time.perf_counter() - start
+
+
+def property_clicks(app: QApplication, buttons: list) -> float:
+    selected = None
+    start = time.perf_counter()
+    for click in range(CLICKS):
+        button = buttons[click % len(buttons)]
+        if selected is not None:
+            set_state(selected, "option", False)
+        set_state(button, "option", True)
+        selected = button
+        app.processEvents()
+    return time.perf_counter() - start
+
+
+def checked_clicks(app: QApplication, buttons: list) -> float:
+    selected = None
+    start = time.perf_counter()
+    for click in range(CLICKS):
+        button = buttons[click % len(buttons)]
+        if selected is not None:
+            selected.setChecked(False)
+        button.setChecked(True)
+        selected = button
+        app.processEvents()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    qdarktheme.setup_theme("auto", additional_qss=APP_QSS)
+
+    for name, clicks, make_button in (
+        ("stylesheet", stylesheet_clicks, QPushButton),
+        ("property", property_clicks, make_checked_button),
+        ("checked", checked_clicks, make_option_button),
+    ):
+        widget, buttons = make_buttons(make_button)
+        app.processEvents()
+        elapsed = clicks(app, buttons)
+        print(f"{name:>10}: {elapsed / CLICKS * 1e6:8.1f} us per click")
+        widget.close()
@@ -1,41 +1,58 @@
+from datetime import date
 import os
 
-from PySide6.QtCore import QMimeData, Qt, Signal
-from PySide6.QtGui import QDrag, QPixmap
+from PySide6.QtCore import (
+    QAbstractListModel,
+    QEvent,
+    QModelIndex,
+    QRect,
+    QSize,
+    Qt,
+    QTimer,
+    Signal,
+)
+from PySide6.QtGui import QCursor, QPalette
 from PySide6.QtWidgets import (
     QApplication,
     QHBoxLayout,
     QLabel,
+    QListView,
     QMainWindow,
     QMessageBox,
-    QScrollArea,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionButton,
+    QToolTip,
     QVBoxLayout,
     QWidget,
     QPushButton,
     QSizePolicy,
 )
-import orjson
 import qdarktheme
 
+from alum.constants import APP_QSS, DAY_INDO
+from alum.storage.aggregates import ACCURACY_WINDOWS
+from alum.storage.checkpoint import read_checkpoint, remove_checkpoint
+from alum.storage.store import DataStore
 from alum.widgets.custom_widgets import SlidingStackedWidget
+from alum.widgets.history_window import HistoryWindow
 from alum.widgets.settings_slide import TestSettings
+from alum.widgets.test_slide import TestSession, TestWidget
 from alum.widgets.review_window import ReviewTestWindow
-from alum.constants import ORJSON_OPTIONS
 
 
 # TODO Pause feature
-# TODO milisecond instead of second
 
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
 
-        # Create data.json if it has not been created before
-        data_path = os.path.join(self.get_root_abspath(), "data.json")
-        if not os.path.exists(data_path):
-            with open(data_path, "w") as f:
-                f.write("{}")
+        # Test data storage, shared by every widget with DataStore.instance()
+        # data from the older version is imported the first time the database is created
+        self.store = DataStore.open(self.get_root_abspath())
+        self.store.writeFailed.connect(self.show_write_error)
+        self.showing_write_error = False
 
         # Window
         self.setWindowTitle("ALUM")
@@ -61,6 +78,9 @@ class MainWindow(QMainWindow):
         # Init UI
         self.init_home_slide()
 
+        # After the window is shown
+        QTimer.singleShot(0, self.resume_test)
+
     def init_home_slide(self):
         # Home slide widget
         home_slide = QWidget()
@@ -73,11 +93,12 @@ class MainWindow(QMainWindow):
 
         # Start button
         start_button_container = QWidget()
-        start_button_container.setLayout(QHBoxLayout())
+        start_button_container.setLayout(QVBoxLayout())
         start_button_container.setSizePolicy(
             QSizePolicy.Expanding, QSizePolicy.Expanding
         )
         home_slide.layout().addWidget(start_button_container)
+        start_button_container.layout().addStretch()
 
         # "Mulai" button
         start_button = QPushButton("Mulai")
@@ -88,6 +109,20 @@ class MainWindow(QMainWindow):
             start_button, alignment=Qt.AlignCenter
         )
 
+        # Statistics of every test done so far
+        self.history_stats = HistoryStatsLabel()
+        start_button_container.layout().addWidget(self.history_stats)
+
+        # More statistics in their own window
+        self.history_window = None
+        history_button = QPushButton("Statistik semua tes")
+        history_button.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        history_button.clicked.connect(self.open_history)
+        start_button_container.layout().addWidget(
+            history_button, alignment=Qt.AlignCenter
+        )
+        start_button_container.layout().addStretch()
+
     # This will only be used outside of this class,
     # because this file is in the root directory, but other files are inside
     # another directory
@@ -109,19 +144,136 @@ class MainWindow(QMainWindow):
 
         self.main.slideInNext()
 
+    # Open the statistics window, or bring it to the front if it's already open
+    def open_history(self):
+        if self.history_window is None:
+            self.history_window = HistoryWindow()
+            self.history_window.windowClosed.connect(self.close_history)
+            self.history_window.show()
+        else:
+            self.history_window.raise_()
+            self.history_window.activateWindow()
+
+    def close_history(self, _):
+        self.history_window = None
+
+    # Offer to continue the test that wasn't finished the last time the app ran
+    # (see storage/checkpoint.py), the clocks go on from the last checkpoint.
+    # A test that was finished but not saved goes on from the answer key slide
+    def resume_test(self):
+        root_path = self.get_root_abspath()
+        checkpoint = read_checkpoint(root_path)
+        if checkpoint is None:
+            return
+
+        settings = checkpoint["pengaturan"]
+        session = TestSession.restore(
+            settings["first_question_num"],
+            settings["question_counts"],
+            settings["question_options"],
+            checkpoint["log_kejadian"],
+            checkpoint["log_waktu"],
+            checkpoint["durasi"],
+        )
+
+        qm = QMessageBox
+        if session.is_finished():
+            message = "Ada tes yang sudah selesai tetapi belum disimpan,\napakah anda ingin mengisi kunci jawaban tes tersebut?"
+        else:
+            message = "Ada tes yang belum selesai dikerjakan,\napakah anda ingin melanjutkan tes tersebut?"
+        res = qm.question(self, "Tes belum selesai", message, qm.Yes | qm.No)
+        if res == qm.No:
+            remove_checkpoint(root_path)
+            return
+
+        # Same slides as a test started from the settings
+        self.main.addWidget(TestSettings(self.main))
+        test_widget = TestWidget(**settings, session=session)
+        self.main.addWidget(test_widget)
+        if session.is_finished():
+            self.main.addWidget(test_widget.answer_key_slide())
+        self.main.slideInIdx(self.main.count() - 1)
+
+    # A change couldn't be saved, it's still in memory and will be saved again later.
+    # Only one message at a time, the errors of the next batches are the same
+    def show_write_error(self, message: str):
+        if self.showing_write_error:
+            return
+        self.showing_write_error = True
+        QMessageBox.warning(
+            self,
+            "Gagal menyimpan",
+            f"Perubahan data gagal disimpan, penyimpanan akan dicoba lagi.\n\n{message}",
+        )
+        self.showing_write_error = False
+
     def closeEvent(self, event):
-        # also close all test review windows
+        # The test that is still going on can be resumed on the next run
+        for idx in range(self.main.count()):
+            widget = self.main.widget(idx)
+            if isinstance(widget, TestWidget):
+                widget.close_checkpoint(remove=False)
+
+        # also close all test review windows and the statistics window
         self.review_test.test_review_windows = []
+        if self.history_window is not None:
+            self.history_window.close()
+        # write the changes still waiting in the background writer before quitting
+        self.store.flush()
+        self.store.close()
         event.accept()
 
 
+# Statistics of the whole history under the start button,
+# read from the aggregates of the store, so no test data is loaded for them
+class HistoryStatsLabel(QLabel):
+    def __init__(self):
+        super().__init__()
+        self.store = DataStore.instance()
+
+        self.setAlignment(Qt.AlignCenter)
+        self.setStyleSheet("color: Grey; margin-top: 10px")
+        self.store.aggregatesChanged.connect(self.update_stats)
+        self.update_stats()
+
+    def update_stats(self):
+        aggregates = self.store.aggregates
+        if not aggregates.rows:
+            self.setText("")
+            return
+
+        hours, minutes = divmod(aggregates.total_time // 60000, 60)
+        lines = [f"{len(aggregates.rows)} tes, {hours} jam {minutes} menit latihan"]
+
+        accuracies = []
+        for window in ACCURACY_WINDOWS:
+            accuracy = aggregates.recent_accuracy(window)
+            if accuracy is not None:
+                accuracies.append(f"{window} tes terakhir {accuracy:.0%}")
+        if accuracies:
+            lines.append("Akurasi " + ", ".join(accuracies))
+
+        streak = aggregates.current_streak(date.today().toordinal())
+        lines.append(
+            f"Latihan berturut-turut: {streak} hari "
+            f"(terpanjang {aggregates.longest_streak} hari)"
+        )
+
+        best = aggregates.best_weekday()
+        if best is not None:
+            weekday, accuracy = best
+            day_name = list(DAY_INDO.values())[weekday].capitalize()
+            lines.append(f"Hari terbaik: {day_name} ({accuracy:.0%})")
+
+        self.setText("\n".join(lines))
+
+
 # Test list on the left side of the window
 class ReviewTestPane(QWidget):
     def __init__(self):
         super().__init__()
 
-        self.abspath = os.path.dirname(os.path.abspath(__file__))
-        self.data_path = os.path.join(self.abspath, "data.json")
+        self.store = DataStore.instance()
         self.test_review_windows = []
 
         self.setLayout(QVBoxLayout())
@@ -133,50 +285,44 @@ class ReviewTestPane(QWidget):
         label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
         self.layout().addWidget(label)
 
-        # Side pane list
-        self.test_list_scroll = QScrollArea()
-        self.test_list_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.layout().addWidget(self.test_list_scroll)
-
-        # Update everytime it starts
-        self.update_test_list()
-
-    # Called everytime the program want to update test list because
-    # an update on data.json
-    def update_test_list(self):
-        with open(self.data_path, "r") as f:
-            self.data = orjson.loads(f.read())
-
-        # Create a new test list widget everytime this function is called
-        test_list = TestListWidget(self.data)
-        test_list.testNameClicked.connect(self.review_test)
-        test_list.deleteTestClicked.connect(self.delete_test)
-        test_list.dataOrderChanged.connect(self.update_data_order)
-
-        self.test_list_scroll.setWidget(test_list)
+        # Side pane list, only the visible rows are painted
+        self.test_list_model = TestListModel()
+        delegate = TestListDelegate()
+        delegate.testNameClicked.connect(self.review_test)
+        delegate.deleteTestClicked.connect(self.delete_test)
+
+        self.test_list = QListView()
+        self.test_list.setModel(self.test_list_model)
+        self.test_list.setItemDelegate(delegate)
+        self.test_list.setUniformItemSizes(True)
+        self.test_list.setMouseTracking(True)
+        self.test_list.setSelectionMode(QListView.SingleSelection)
+        self.test_list.setDragDropMode(QListView.InternalMove)
+        self.test_list.setDefaultDropAction(Qt.MoveAction)
+        self.test_list.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.layout().addWidget(self.test_list)
 
     # Open review test window
-    def review_test(self, test_name: str):
-        test_data = self.data[test_name]
-
+    def review_test(self, test_id: int):
         # Prevent opening an already opened test review
         for win in self.test_review_windows:
-            if test_name == win.test_name:
+            if test_id == win.test_id:
                 return
 
         # Add window to the list and show it
-        review_test = ReviewTestWindow(test_name, test_data, self.data_path)
+        review_test = ReviewTestWindow(test_id)
         review_test.windowClosed.connect(self.close_window)
-        review_test.dataUpdated.connect(self.update_test_list)
-        review_test.testNameRenamed.connect(self.update_test_name)
         self.test_review_windows.append(review_test)
         self.test_review_windows[-1].show()
 
     def close_window(self, widget):
         self.test_review_windows.remove(widget)
+        self.store.unload_test(widget.test_id)
 
     # Delete test review from list
-    def delete_test(self, test_name: str):
+    def delete_test(self, test_id: int):
+        test_name = self.store.get_name(test_id)
+
         # Confirmation
         qm = QMessageBox
         warning = qm.warning(
@@ -191,150 +337,180 @@ class ReviewTestPane(QWidget):
         # Close test review window if it opened
         # by deleting it from the test review windows list
         for win in self.test_review_windows:
-            if win.test_name == test_name:
+            if win.test_id == test_id:
                 self.test_review_windows.remove(win)
 
-        # Update the file and the list
-        self.data.pop(test_name)
-        with open(self.data_path, "wb") as f:
-            f.write(orjson.dumps(self.data, option=ORJSON_OPTIONS))
+        # The list is updated by the store
+        self.store.delete_test(test_id)
 
-        self.update_test_list()
 
-    # data Updated, just write it to the file, because the order already changed in TestListWidget
-    def update_data_order(self, new_data):
-        self.data = new_data
+# Test names of the store, in the same order as the test list.
+# Follows the changes of the store row by row, the list is never built again
+class TestListModel(QAbstractListModel):
+    TestIdRole = Qt.UserRole
 
-        with open(self.data_path, "wb") as f:
-            f.write(orjson.dumps(self.data, option=ORJSON_OPTIONS))
-
-    def update_test_name(self, old_name, new_name):
-        idx = list(self.data.keys()).index(old_name)
-        widget = self.test_list_scroll.widget().layout().itemAt(idx).widget()
-        widget.test_name_btn.setText(new_name)
-
-        # reload new data
-        with open(self.data_path, "r") as f:
-            self.data = orjson.loads(f.read())
-
-
-class TestListWidget(QWidget):
-    # Signal
-    testNameClicked = Signal(str)
-    deleteTestClicked = Signal(str)
-    dataOrderChanged = Signal(dict)
-
-    def __init__(self, data) -> None:
-        super().__init__()
-        self.data = data
-        self.margin = 4
-
-        self.setAcceptDrops(True)
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
-        self.setLayout(QVBoxLayout())
-        self.layout().setSpacing(0)
-        self.layout().setContentsMargins(*[self.margin for _ in range(4)])
-
-        # Add buttons (test name and delete test) to the grid
-        test_names = list(self.data.keys())
-        for name in test_names:
-            test_item = TestListItem(name)
-            test_item.testNameClicked.connect(self.review_test)
-            test_item.deleteTestClicked.connect(self.delete_test)
-
-            self.layout().addWidget(test_item)
-
-    def review_test(self, test_name: str):
-        self.testNameClicked.emit(test_name)
-
-    def delete_test(self, test_name: str):
-        self.deleteTestClicked.emit(test_name)
-
-    def dragEnterEvent(self, event):
-        event.accept()
-
-    def dropEvent(self, event):
-        pos = event.position()
-        widget = event.source()
-
-        width = widget.height()
-        idx = int((pos.y() - self.margin) // width)
-
-        prev_idx = int(widget.y() - self.margin) // width
-
-        # Down one list
-        move_down = pos.y() - (width // 2) > width * idx
-
-        # I don't know what I'm doing here, but the code works
-        # Go Down
-        if prev_idx < idx:
-            if not move_down:
-                idx = idx - 1
-        # Go Up
-        elif prev_idx > idx:
-            if move_down:
-                idx = idx + 1
-
-        # If it's at the end of the list, addWidget instead
-        if idx == len(self.data.keys()):
-            self.layout().addWidget(widget)
-        else:
-            self.layout().insertWidget(idx, widget)
-
-        # Update list
-        new_data = {}
-        for n in range(self.layout().count()):
-            test_name = self.layout().itemAt(n).widget().test_name
-            new_data[test_name] = self.data[test_name]
-
-        event.accept()
-        self.dataOrderChanged.emit(new_data)
-
-
-class TestListItem(QWidget):
-    testNameClicked = Signal(str)
-    deleteTestClicked = Signal(str)
-
-    def __init__(self, test_name: str):
+    def __init__(self):
         super().__init__()
-        self.test_name = test_name
-
-        self.setLayout(QHBoxLayout())
-        self.layout().setContentsMargins(4, 4, 4, 4)
-
-        self.test_name_btn = QPushButton(test_name)
-        self.test_name_btn.setFixedWidth(190)
-        self.test_name_btn.setStyleSheet("text-align: left;")
-        self.test_name_btn.clicked.connect(self.test_name_btn_clicked)
-        self.layout().addWidget(self.test_name_btn)
-
-        self.del_test_btn = QPushButton("X")
-        self.del_test_btn.setToolTip("Hapus data tes")
-        self.del_test_btn.clicked.connect(self.delete_btn_clicked)
-        self.layout().addWidget(self.del_test_btn)
-
-    def test_name_btn_clicked(self):
-        self.testNameClicked.emit(self.test_name)
-
-    def delete_btn_clicked(self):
-        self.deleteTestClicked.emit(self.test_name)
-
-    def mouseMoveEvent(self, event):
-        if event.buttons() == Qt.LeftButton:
-            drag = QDrag(self)
-            mime = QMimeData()
-            drag.setMimeData(mime)
-
-            pixmap = QPixmap(self.size())
-            self.render(pixmap)
-            drag.setPixmap(pixmap)
-
-            drag.exec(Qt.MoveAction)
+        self.store = DataStore.instance()
+        self.test_ids = self.store.test_ids()
+
+        self.store.testAdded.connect(self.add_test)
+        self.store.testRemoved.connect(self.remove_test)
+        self.store.testRenamed.connect(self.update_test)
+        self.store.testChanged.connect(self.update_test)
+        self.store.testMoved.connect(self.move_test)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.test_ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        test_id = self.test_ids[index.row()]
+
+        if role == Qt.DisplayRole:
+            return self.store.get_name(test_id)
+        if role == Qt.ToolTipRole:
+            summary = self.store.get_summary(test_id)
+            return (
+                f"{summary['tanggal_tes']}\n"
+                f"Jawaban benar: {summary['benar']}/{summary['jumlah_soal']}"
+            )
+        if role == self.TestIdRole:
+            return test_id
+        return None
+
+    # Rows can only be dropped between the rows, not on them
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    # Called by QListView when a row is dragged, destination is the row it's dropped before
+    def moveRows(self, source_parent, source_row, count, destination_parent, destination):
+        if count != 1:
+            return False
+        if not self.beginMoveRows(
+            source_parent, source_row, source_row, destination_parent, destination
+        ):
+            return False
+
+        test_id = self.test_ids.pop(source_row)
+        idx = destination if destination < source_row else destination - 1
+        self.test_ids.insert(idx, test_id)
+        self.endMoveRows()
+
+        # The row is already moved when testMoved comes back
+        self.store.move_test(test_id, idx)
+        return True
+
+    ##########################################
+    # Store changes
+    ##########################################
+    def add_test(self, test_id: int):
+        row = self.store.order.index(test_id)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.test_ids.insert(row, test_id)
+        self.endInsertRows()
+
+    def remove_test(self, test_id: int):
+        row = self.test_ids.index(test_id)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.test_ids[row]
+        self.endRemoveRows()
+
+    # The name or the summary of the test changed
+    def update_test(self, test_id: int):
+        index = self.index(self.test_ids.index(test_id))
+        self.dataChanged.emit(index, index)
+
+    def move_test(self, test_id: int):
+        row = self.test_ids.index(test_id)
+        idx = self.store.order.index(test_id)
+        if row == idx:
+            return
+        destination = idx if idx < row else idx + 1
+        self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), destination)
+        self.test_ids.insert(idx, self.test_ids.pop(row))
+        self.endMoveRows()
+
+
+# Paints a row of the test list as the test name button and the delete button
+class TestListDelegate(QStyledItemDelegate):
+    ROW_HEIGHT = 34
+    DELETE_WIDTH = 30
+    MARGIN = 2
+
+    testNameClicked = Signal(int)
+    deleteTestClicked = Signal(int)
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    # Rect of the name button and the delete button of the row
+    def button_rects(self, rect: QRect) -> tuple:
+        rect = rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+        delete_rect = QRect(rect)
+        delete_rect.setLeft(rect.right() - self.DELETE_WIDTH)
+        name_rect = QRect(rect)
+        name_rect.setRight(delete_rect.left() - self.MARGIN * 2)
+        return name_rect, delete_rect
+
+    def paint(self, painter, option, index):
+        widget = option.widget
+        style = widget.style()
+        name_rect, delete_rect = self.button_rects(option.rect)
+        hovered = option.state & QStyle.State_MouseOver
+        mouse_pos = widget.viewport().mapFromGlobal(QCursor.pos())
+
+        for rect, text in ((name_rect, ""), (delete_rect, "X")):
+            button = QStyleOptionButton()
+            button.rect = rect
+            button.text = text
+            button.state = QStyle.State_Enabled
+            if hovered and rect.contains(mouse_pos):
+                button.state |= QStyle.State_MouseOver
+            style.drawControl(QStyle.CE_PushButton, button, painter, widget)
+
+        # The name is aligned to the left, like the old name buttons
+        name = index.data(Qt.DisplayRole)
+        text_rect = name_rect.adjusted(8, 0, -4, 0)
+        name = option.fontMetrics.elidedText(name, Qt.ElideRight, text_rect.width())
+        painter.save()
+        painter.setPen(option.palette.color(QPalette.ButtonText))
+        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignVCenter, name)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            test_id = index.data(TestListModel.TestIdRole)
+            name_rect, delete_rect = self.button_rects(option.rect)
+            pos = event.position().toPoint()
+            if delete_rect.contains(pos):
+                self.deleteTestClicked.emit(test_id)
+                return True
+            if name_rect.contains(pos):
+                self.testNameClicked.emit(test_id)
+                return True
+        return super().editorEvent(event, model, option, index)
+
+    def helpEvent(self, event, view, option, index):
+        # Only the name button has a tooltip, like the old name buttons
+        name_rect, delete_rect = self.button_rects(option.rect)
+        if event.type() == QEvent.ToolTip and delete_rect.contains(event.pos()):
+            QToolTip.showText(event.globalPos(), "Hapus data tes", view)
+            return True
+        return super().helpEvent(event, view, option, index)
 
 
 if __name__ == "__main__":
     app = QApplication([])
-    qdarktheme.setup_theme("auto")
+    qdarktheme.setup_theme("auto", additional_qss=APP_QSS)
     window = MainWindow()
     window.show()
     app.exec()
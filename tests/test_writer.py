@@ -0,0 +1,62 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QCoreApplication
+
+from alum.storage.codec import encode_test
+from alum.storage.repository import open_repository
+from alum.storage.store import DataStore
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+def sample_test() -> dict:
+    return encode_test(
+        {
+            "batas_waktu": 0,
+            "nomor_pertama": 1,
+            "jumlah_soal": 2,
+            "opsi_soal": ["A", "B"],
+            "jawaban_tes": {"1": "A", "2": ""},
+            "kunci_jawaban": {"1": "A", "2": "B"},
+            "waktu_yang_digunakan": {"total": 5, "per_soal": {"1": 3, "2": 2}},
+            "tanggal_tes": "01/01/2023, 10:00:00",
+            "catatan_tes": "",
+        }
+    )
+
+
+# A takes a new name, B takes the old name of A, then A is renamed again:
+# the renames have to be written in that order, or the names collide
+def check_rename_swap(tmp_path, backend: str):
+    store = DataStore(open_repository(str(tmp_path), backend), str(tmp_path))
+    errors = []
+    store.writeFailed.connect(errors.append)
+    test_a = store.add_test("X", sample_test())
+    test_b = store.add_test("B", sample_test())
+    store.flush()
+
+    store.rename_test(test_a, "Y")
+    store.rename_test(test_b, "X")
+    store.rename_test(test_a, "W")
+    store.flush()
+    assert store.writer.failed == {}
+    store.close()
+    app.processEvents()
+    assert errors == []
+
+    repo = open_repository(str(tmp_path), backend)
+    manifest = repo.load_manifest()
+    repo.close()
+    assert manifest[test_a]["nama"] == "W"
+    assert manifest[test_b]["nama"] == "X"
+
+
+def test_rename_swap_sqlite(tmp_path):
+    check_rename_swap(tmp_path, "sqlite")
+
+
+def test_rename_swap_json(tmp_path):
+    check_rename_swap(tmp_path, "json")